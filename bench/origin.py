@@ -0,0 +1,302 @@
+"""
+Stand-in for the Dramabox/NetShort sites and their CDNs, serving synthetic
+content from memory with configurable latency, bandwidth and faults:
+
+    /series/<name>[/page/<n>]       NetShort-style listing pages, 404 past the last
+    /episode/<name>-<n>             episode page with the media URL in an inline script
+    /hls/<ep>/master.m3u8           master playlist, one variant per entry of `variants`
+    /hls/<ep>/<variant>/index.m3u8  media playlist
+    /hls/<ep>/<variant>/<i>.ts      MPEG-TS segment
+    /video/<ep>.mp4                 file honouring Range/If-Range
+    /_stats, /_reset                request timings recorded so far (JSON), and clearing them
+
+bench/run.py starts it by itself. To download its media URLs with the GUI or
+cli.py (listings also need NetShortPlatform registered for "localhost"), run
+
+    python -m bench.origin [--port 8800] [--latency 0.05] [--bandwidth 2M] [--error-rate 0.02]
+
+Faults (5xx and 403) are only injected into segment and ranged MP4 requests,
+the ones the downloader retries. Media URLs carry an expires= token.
+"""
+import argparse
+import json
+import random
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Bytes written per socket send when throttling to `bandwidth`
+SEND_CHUNK = 16 * 1024
+# Period of the byte pattern MP4 files are made of
+PATTERN_SIZE = 64 * 1024
+# Lifetime of the expires= token on media URLs
+TOKEN_TTL = 3600
+
+
+class OriginConfig:
+    """What the origin serves and how badly; sizes in bytes, times in seconds."""
+
+    def __init__(self, latency=0.02, bandwidth=0, error_rate=0.0, forbidden_rate=0.0,
+                 segments=30, segment_size=256 * 1024, variants=(1080, 720, 360),
+                 mp4_size=64 * 1024 * 1024, pages=10, per_page=24, page_padding=48 * 1024, seed=1):
+        self.latency = latency
+        self.bandwidth = bandwidth  # Per connection, 0 = unlimited
+        self.error_rate = error_rate
+        self.forbidden_rate = forbidden_rate
+        self.segments = segments
+        self.segment_size = segment_size  # Of the best variant; lower ones scale with height
+        self.variants = tuple(variants)
+        self.mp4_size = mp4_size
+        self.pages = pages
+        self.per_page = per_page
+        self.page_padding = page_padding  # Markup before the interesting part of each page
+        self.seed = seed
+
+
+def ts_segment(size, counter_seed=0):
+    """`size` rounded down to whole 188-byte TS packets of PID 0x100 with filler payload."""
+    packets = bytearray()
+    for n in range(max(1, size // 188)):
+        packets += bytes((0x47, 0x41 if n == 0 else 0x01, 0x00, 0x10 | ((n + counter_seed) & 0x0F)))
+        packets += bytes((n + counter_seed) & 0xFF for _ in range(4)) * 46
+    return bytes(packets)
+
+
+class OriginStats:
+    """Per request kind: count, bytes sent, durations (first byte read to last byte sent) and status codes."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.kinds = {}
+
+    def record(self, kind, status, sent, duration):
+        with self.lock:
+            entry = self.kinds.setdefault(kind, {"count": 0, "bytes": 0, "durations": [], "status": {}})
+            entry["count"] += 1
+            entry["bytes"] += sent
+            entry["durations"].append(duration)
+            entry["status"][str(status)] = entry["status"].get(str(status), 0) + 1
+
+    def snapshot(self):
+        with self.lock:
+            return json.loads(json.dumps(self.kinds))
+
+
+class OriginHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "BenchOrigin/1.0"
+
+    ROUTES = (
+        ("page", re.compile(r'/series/([\w-]+)(?:/page/(\d+))?/?$')),
+        ("episode", re.compile(r'/episode/([\w-]+)-(\d+)$')),
+        ("master", re.compile(r'/hls/([\w-]+)/master\.m3u8$')),
+        ("playlist", re.compile(r'/hls/([\w-]+)/(\d+)p/index\.m3u8$')),
+        ("segment", re.compile(r'/hls/([\w-]+)/(\d+)p/(\d+)\.ts$')),
+        ("mp4", re.compile(r'/video/([\w-]+)\.mp4$')),
+    )
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        started = time.perf_counter()
+        path = self.path.split('?', 1)[0]
+        if path == "/_stats":
+            return self.send_body(200, json.dumps(self.server.stats.snapshot()).encode(), "application/json")
+        if path == "/_reset":
+            self.server.stats.reset()
+            return self.send_body(204, b"")
+
+        for kind, pattern in self.ROUTES:
+            match = pattern.match(path)
+            if match:
+                break
+        else:
+            return self.send_body(404, b"Not found")
+
+        config = self.server.config
+        if config.latency:
+            time.sleep(config.latency)
+        retried = kind == "segment" or (kind == "mp4" and "Range" in self.headers)
+        fault = self.server.fault() if retried else None
+        if fault:
+            status, sent = fault, self.send_body(fault, b"Injected fault")
+        else:
+            status, sent = getattr(self, "serve_" + kind)(*match.groups())
+        self.server.stats.record(kind, status, sent, time.perf_counter() - started)
+
+    def send_body(self, status, body, content_type="text/plain", headers=None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        return self.write_throttled(body)
+
+    def write_throttled(self, body):
+        bandwidth = self.server.config.bandwidth
+        view = memoryview(body)
+        for start in range(0, len(view), SEND_CHUNK):
+            chunk = view[start:start + SEND_CHUNK]
+            self.wfile.write(chunk)
+            if bandwidth:
+                time.sleep(len(chunk) / bandwidth)
+        return len(body)
+
+    def media_url(self, path):
+        host = f"{self.server.server_address[0]}:{self.server.server_address[1]}"
+        return f"http://{host}{path}?expires={int(time.time()) + TOKEN_TTL}"
+
+    def serve_page(self, name, page):
+        config = self.server.config
+        page = int(page or 1)
+        if page > config.pages:
+            return 404, self.send_body(404, b"Not found")
+        links = "".join(f'<a href="/episode/{name}-{(page - 1) * config.per_page + n + 1}">Episode</a>\n'
+                        for n in range(config.per_page))
+        html = f"<html><head>{'<meta name=x>' * (config.page_padding // 13)}</head><body>{links}</body></html>"
+        return 200, self.send_body(200, html.encode(), "text/html")
+
+    def serve_episode(self, name, number):
+        config = self.server.config
+        media = self.media_url(f"/hls/{name}-{number}/master.m3u8")
+        html = (f"<html><head>{'<meta name=x>' * (config.page_padding // 13)}</head><body>"
+                f"<script>window.player = {{\"src\": \"{media}\"}};</script></body></html>")
+        return 200, self.send_body(200, html.encode(), "text/html")
+
+    def serve_master(self, episode):
+        config = self.server.config
+        lines = ["#EXTM3U"]
+        for height in config.variants:
+            size = self.server.segment_size(height)
+            lines.append(f"#EXT-X-STREAM-INF:BANDWIDTH={size * 8 // 4},RESOLUTION={height * 16 // 9}x{height}")
+            lines.append(self.media_url(f"/hls/{episode}/{height}p/index.m3u8"))
+        return 200, self.send_body(200, ("\n".join(lines) + "\n").encode(), "application/vnd.apple.mpegurl")
+
+    def serve_playlist(self, episode, height):
+        config = self.server.config
+        lines = ["#EXTM3U", "#EXT-X-VERSION:3", "#EXT-X-TARGETDURATION:4", "#EXT-X-MEDIA-SEQUENCE:0"]
+        for i in range(config.segments):
+            lines.append("#EXTINF:4.000,")
+            lines.append(f"{i}.ts?expires={int(time.time()) + TOKEN_TTL}")
+        lines.append("#EXT-X-ENDLIST")
+        return 200, self.send_body(200, ("\n".join(lines) + "\n").encode(), "application/vnd.apple.mpegurl")
+
+    def serve_segment(self, episode, height, index):
+        if int(index) >= self.server.config.segments:
+            return 404, self.send_body(404, b"Not found")
+        return 200, self.send_body(200, self.server.segment(int(height)), "video/mp2t")
+
+    def serve_mp4(self, episode):
+        size = self.server.config.mp4_size
+        headers = {"Accept-Ranges": "bytes", "ETag": '"bench-1"'}
+        start, end, status = 0, size - 1, 200
+        match = re.match(r'bytes=(\d+)-(\d*)$', self.headers.get("Range", ""))
+        if match and self.headers.get("If-Range", '"bench-1"') == '"bench-1"':
+            start = int(match.group(1))
+            end = min(int(match.group(2) or size - 1), size - 1)
+            if start > end:
+                return 416, self.send_body(416, b"", headers={"Content-Range": f"bytes */{size}"})
+            status = 206
+            headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+
+        self.send_response(status)
+        self.send_header("Content-Type", "video/mp4")
+        self.send_header("Content-Length", str(end - start + 1))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        # The file is a repeating pattern, sent without ever materialising it
+        pattern = self.server.pattern
+        sent = 0
+        position = start
+        while position <= end:
+            offset = position % PATTERN_SIZE
+            count = min(PATTERN_SIZE - offset, end + 1 - position)
+            try:
+                sent += self.write_throttled(pattern[offset:offset + count])
+            except (BrokenPipeError, ConnectionResetError):
+                break  # Client stopped reading (e.g. the probe request of a ranged download)
+            position += count
+        return status, sent
+
+
+class OriginServer(ThreadingHTTPServer):
+    """The origin on 127.0.0.1; port 0 picks a free one (see `url`)."""
+    daemon_threads = True
+
+    def __init__(self, config=None, port=0):
+        super().__init__(("127.0.0.1", port), OriginHandler)
+        self.config = config or OriginConfig()
+        self.stats = OriginStats()
+        self.random = random.Random(self.config.seed)
+        self.random_lock = threading.Lock()
+        self.segments = {}  # height: segment bytes
+        self.pattern = memoryview(bytes(i * 7 & 0xFF for i in range(PATTERN_SIZE)))
+
+    def handle_error(self, request, client_address):
+        # Clients drop connections all the time (cancelled prefetches, range probes)
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def fault(self):
+        """Status code of a fault to inject, or None."""
+        with self.random_lock:
+            roll = self.random.random()
+        if roll < self.config.forbidden_rate:
+            return 403
+        if roll < self.config.forbidden_rate + self.config.error_rate:
+            return 503
+        return None
+
+    def segment_size(self, height):
+        return self.config.segment_size * height // max(self.config.variants)
+
+    def segment(self, height):
+        data = self.segments.get(height)
+        if data is None:
+            data = self.segments[height] = ts_segment(self.segment_size(height), height)
+        return data
+
+    def start(self):
+        """Serves on a daemon thread; returns self."""
+        threading.Thread(target=self.serve_forever, name="BenchOrigin", daemon=True).start()
+        return self
+
+
+def main(argv=None):
+    from core.ratelimit import parse_rate
+
+    parser = argparse.ArgumentParser(description="Serve synthetic listings, playlists and media locally.")
+    parser.add_argument("--port", type=int, default=8800)
+    parser.add_argument("--latency", type=float, default=0.02)
+    parser.add_argument("--bandwidth", default="", help="per-connection speed, e.g. 2M (default: unlimited)")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--forbidden-rate", type=float, default=0.0)
+    args = parser.parse_args(argv)
+
+    config = OriginConfig(latency=args.latency, bandwidth=parse_rate(args.bandwidth),
+                          error_rate=args.error_rate, forbidden_rate=args.forbidden_rate)
+    server = OriginServer(config, args.port)
+    print(f"Listing:  {server.url.replace('127.0.0.1', 'localhost')}/series/bench")
+    print(f"HLS:      {server.url}/hls/bench-1/master.m3u8")
+    print(f"MP4:      {server.url}/video/bench-1.mp4")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
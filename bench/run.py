@@ -0,0 +1,255 @@
+"""
+Benchmarks the scrape and download paths against the local stand-in origin
+(bench/origin.py), so throughput regressions show up as numbers:
+
+    python -m bench.run [scenario ...] [--latency 0.05] [--bandwidth 2M] [--error-rate 0.02]
+                        [--forbidden-rate 0.01] [-j 3] [--output bench_output.txt]
+
+Scenarios (default: all):
+    scrape    crawl a paginated NetShort-style listing, episodes only
+    hls       download HLS episodes (master -> variant -> segments)
+    mp4       download MP4 files over parallel byte ranges
+    pipeline  scrape a listing, resolve each episode page and download it
+
+The origin runs in this process; each scenario runs in a fresh child process
+with the same engine as cli.py, so its CPU time and peak RSS are its own.
+Latency percentiles are measured at the origin: request received to last byte sent.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from bench.origin import OriginConfig, OriginServer
+from core.ratelimit import parse_rate
+
+SCENARIOS = ("scrape", "hls", "mp4", "pipeline")
+
+# Request kind whose latency a scenario reports
+LATENCY_KIND = {"scrape": "page", "hls": "segment", "mp4": "mp4", "pipeline": "segment"}
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def peak_rss():
+    """Peak resident memory of this process in bytes, or None where it cannot be read."""
+    try:
+        import resource
+    except ImportError:
+        return _windows_peak_rss()
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _windows_peak_rss():
+    try:
+        import ctypes
+        from ctypes import wintypes
+
+        class Counters(ctypes.Structure):
+            _fields_ = [("cb", wintypes.DWORD), ("PageFaultCount", wintypes.DWORD)] + [
+                (name, ctypes.c_size_t) for name in (
+                    "PeakWorkingSetSize", "WorkingSetSize", "QuotaPeakPagedPoolUsage", "QuotaPagedPoolUsage",
+                    "QuotaPeakNonPagedPoolUsage", "QuotaNonPagedPoolUsage", "PagefileUsage", "PeakPagefileUsage")]
+
+        counters = Counters()
+        counters.cb = ctypes.sizeof(counters)
+        process = ctypes.windll.kernel32.GetCurrentProcess()
+        if ctypes.windll.psapi.GetProcessMemoryInfo(process, ctypes.byref(counters), counters.cb):
+            return counters.PeakWorkingSetSize
+    except Exception:
+        pass
+    return None
+
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def folder_size(path):
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names)
+
+
+# --- Client side (child process) ---
+
+def run_client(scenario, origin_url, args):
+    """Runs one scenario in this process and returns its client-side measurements."""
+    from cli import HeadlessRunner
+    from core.hls import VariantPolicy, parse_quality
+    from core.manager import get_platform_manager
+
+    class BenchRunner(HeadlessRunner):
+        # Scraped listings are longer than what a download scenario needs
+        def add_videos(self, videos):
+            room = args.episodes - len(self.seen_urls)
+            super().add_videos(videos if self.list_only else videos[:max(0, room)])
+
+    # The listing and episode pages are served as "localhost", the CDN as 127.0.0.1
+    site_url = origin_url.replace("127.0.0.1", "localhost")
+    get_platform_manager().register("localhost", "platforms.netshort:NetShortPlatform")
+
+    download_path = tempfile.mkdtemp(prefix="bench-")
+    runner = BenchRunner(download_path, args.concurrent, list_only=scenario == "scrape",
+                         variant_policy=VariantPolicy(*parse_quality(args.quality)))
+    if scenario in ("scrape", "pipeline"):
+        runner.add_url(f"{site_url}/series/bench")
+    elif scenario == "hls":
+        runner.add_videos([{"title": f"hls {n}", "url": f"{origin_url}/hls/bench-{n}/master.m3u8",
+                            "platform": "Direct"} for n in range(1, args.episodes + 1)])
+    elif scenario == "mp4":
+        runner.add_videos([{"title": f"mp4 {n}", "url": f"{origin_url}/video/bench-{n}.mp4",
+                            "platform": "Direct"} for n in range(1, args.files + 1)])
+
+    started = time.perf_counter()
+    cpu_started = time.process_time()
+    exit_code = runner.run()
+    return {
+        "wall": time.perf_counter() - started,
+        "cpu": time.process_time() - cpu_started,
+        "peak_rss": peak_rss(),
+        "bytes": folder_size(download_path),
+        "items": len(runner.seen_urls) if scenario == "scrape" else runner.completed,
+        "failed": runner.failed,
+        "exit_code": exit_code,
+    }
+
+
+# --- Origin side (this process) ---
+
+def run_scenario(scenario, server, args):
+    server.stats.reset()
+    origin_cpu = time.process_time()
+    command = [sys.executable, "-m", "bench.run", scenario, "--client", server.url] + args.client_args
+    env = dict(os.environ, PYTHONPATH=REPO_ROOT + os.pathsep + os.environ.get("PYTHONPATH", ""))
+    # Run from a scratch folder so the resolve cache and job files never touch config/
+    with tempfile.TemporaryDirectory(prefix="bench-") as scratch:
+        result = subprocess.run(command, cwd=scratch, env=env, capture_output=True, text=True)
+    if result.returncode != 0 or not result.stdout.strip():
+        raise RuntimeError(f"{scenario} failed:\n{result.stderr[-2000:]}")
+    client = json.loads(result.stdout)
+
+    stats = server.stats.snapshot()
+    latencies = stats.get(LATENCY_KIND[scenario], {}).get("durations", [])
+    statuses = {}
+    for entry in stats.values():
+        for status, count in entry["status"].items():
+            statuses[status] = statuses.get(status, 0) + count
+    segments = stats.get("segment", {}).get("status", {}).get("200", 0)
+    wall = client["wall"]
+    return {
+        "scenario": scenario,
+        "items": client["items"],
+        "failed": client["failed"],
+        "wall_s": wall,
+        "segments_per_s": segments / wall if wall else 0,
+        "mb_per_s": client["bytes"] / wall / 1e6 if wall else 0,
+        "p50_ms": (percentile(latencies, 0.50) or 0) * 1000,
+        "p99_ms": (percentile(latencies, 0.99) or 0) * 1000,
+        "requests": sum(entry["count"] for entry in stats.values()),
+        "faults": statuses.get("403", 0) + statuses.get("503", 0),
+        "client_cpu_s": client["cpu"],
+        "origin_cpu_s": time.process_time() - origin_cpu,
+        "peak_rss_mb": client["peak_rss"] / 2 ** 20 if client["peak_rss"] else None,
+    }
+
+
+# Report columns: key, header, format
+COLUMNS = (
+    ("scenario", "scenario", "{:<9}"),
+    ("items", "items", "{:>6}"),
+    ("failed", "failed", "{:>6}"),
+    ("wall_s", "wall s", "{:>7.2f}"),
+    ("segments_per_s", "segs/s", "{:>7.1f}"),
+    ("mb_per_s", "MB/s", "{:>7.1f}"),
+    ("p50_ms", "p50 ms", "{:>7.1f}"),
+    ("p99_ms", "p99 ms", "{:>7.1f}"),
+    ("requests", "requests", "{:>8}"),
+    ("faults", "faults", "{:>6}"),
+    ("client_cpu_s", "cpu s", "{:>7.2f}"),
+    ("origin_cpu_s", "orig cpu", "{:>8.2f}"),
+    ("peak_rss_mb", "RSS MB", "{:>7.1f}"),
+)
+
+
+def format_report(rows, config, args):
+    lines = [f"# {time.strftime('%Y-%m-%d %H:%M:%S')}  latency={config.latency}s "
+             f"bandwidth={args.bandwidth or 'unlimited'} errors={config.error_rate} "
+             f"403s={config.forbidden_rate} concurrent={args.concurrent} quality={args.quality}"]
+    widths = [len(fmt.format(0 if "f" in fmt or key != "scenario" else "")) for key, _, fmt in COLUMNS]
+    lines.append(" ".join(header.ljust(width) if key == "scenario" else header.rjust(width)
+                          for (key, header, _), width in zip(COLUMNS, widths)))
+    for row in rows:
+        lines.append(" ".join("n/a".rjust(width) if row[key] is None else fmt.format(row[key])
+                              for (key, _, fmt), width in zip(COLUMNS, widths)))
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark scraping and downloading against a local origin.")
+    parser.add_argument("scenarios", nargs="*", metavar="scenario",
+                        help=f"{', '.join(SCENARIOS)} (default: all)")
+    parser.add_argument("--latency", type=float, default=0.02, help="seconds before each response (default: 0.02)")
+    parser.add_argument("--bandwidth", default="", help="per-connection speed, e.g. 2M (default: unlimited)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of media requests failing with 503")
+    parser.add_argument("--forbidden-rate", type=float, default=0.0, help="share of media requests failing with 403")
+    parser.add_argument("--segments", type=int, default=30, help="segments per HLS episode (default: 30)")
+    parser.add_argument("--segment-size", default="256K", help="segment size of the best variant (default: 256K)")
+    parser.add_argument("--mp4-size", default="64M", help="size of each MP4 file (default: 64M)")
+    parser.add_argument("--pages", type=int, default=10, help="listing pages (default: 10)")
+    parser.add_argument("--per-page", type=int, default=24, help="episodes per listing page (default: 24)")
+    parser.add_argument("--episodes", type=int, default=12, help="episodes downloaded by hls/pipeline (default: 12)")
+    parser.add_argument("--files", type=int, default=2, help="MP4 files downloaded by mp4 (default: 2)")
+    parser.add_argument("-j", "--concurrent", type=int, default=3, help="simultaneous downloads (default: 3)")
+    parser.add_argument("--quality", default="best", help="HLS variant policy, as in cli.py (default: best)")
+    parser.add_argument("--output", help="also append the report to this file, e.g. bench_output.txt")
+    parser.add_argument("--client", metavar="ORIGIN_URL", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    unknown = [name for name in args.scenarios if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenario: {', '.join(unknown)}")
+    if args.client:
+        # The engine logs to stdout, also from threads still winding down at
+        # exit; only the result line goes to the real one
+        sys.stdout = open(os.devnull, 'w')
+        result = run_client(args.scenarios[0], args.client, args)
+        sys.__stdout__.write(json.dumps(result) + "\n")
+        sys.__stdout__.flush()
+        return 0
+
+    try:
+        config = OriginConfig(latency=args.latency, bandwidth=parse_rate(args.bandwidth),
+                              error_rate=args.error_rate, forbidden_rate=args.forbidden_rate,
+                              segments=args.segments, segment_size=parse_rate(args.segment_size),
+                              mp4_size=parse_rate(args.mp4_size), pages=args.pages, per_page=args.per_page)
+    except ValueError as e:
+        parser.error(str(e))
+    # What the child processes need to rebuild the same client settings
+    args.client_args = ["--episodes", str(args.episodes), "--files", str(args.files),
+                        "-j", str(args.concurrent), "--quality", args.quality]
+
+    server = OriginServer(config).start()
+    rows = []
+    try:
+        for scenario in args.scenarios or SCENARIOS:
+            print(f"Running {scenario}...", file=sys.stderr, flush=True)
+            rows.append(run_scenario(scenario, server, args))
+    finally:
+        server.shutdown()
+
+    report = format_report(rows, config, args)
+    print(report)
+    if args.output:
+        with open(args.output, 'a', encoding='utf-8') as f:
+            f.write(report + "\n\n")
+    return 0 if all(row["failed"] == 0 for row in rows) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,224 @@
+"""
+Headless downloader: scrapes series pages and downloads their episodes with
+the same platforms and engine as the GUI, without importing Qt.
+
+    python cli.py URL [URL ...] [-i urls.txt] [-o downloads] [-j 3]
+
+Interrupted downloads resume from their partial data when run again.
+"""
+import argparse
+import os
+import queue
+import sys
+import time
+from urllib.parse import urlsplit, unquote
+
+from core.manager import get_platform_manager
+from core.downloader import DownloadTask
+from core.scheduler import DownloadScheduler
+from core.prefetch import Prefetcher
+from core.scrape_engine import ScrapeEngine
+from core.progress import ProgressBoard, format_bytes, format_eta
+from core.ratelimit import get_rate_limiter, parse_rate
+from core.hls import VariantPolicy, parse_quality
+from core.metrics import METRICS_PORT, start_metrics_server
+
+# Seconds between progress lines
+REPORT_INTERVAL = 1.0
+
+
+def read_urls(args):
+    urls = list(args.urls)
+    for path in args.input or []:
+        f = sys.stdin if path == "-" else open(path, 'r', encoding='utf-8')
+        with f:
+            urls.extend(line.strip() for line in f)
+    # Blank lines and comments are skipped, duplicates dropped
+    return list(dict.fromkeys(url for url in urls if url and not url.startswith('#')))
+
+
+def title_from_url(url):
+    name = unquote(urlsplit(url).path.rstrip('/').rsplit('/', 1)[-1])
+    return os.path.splitext(name)[0] or urlsplit(url).hostname or "video"
+
+
+class HeadlessRunner:
+    """
+    Drives scrapes and downloads from the main thread. Engine callbacks run on
+    background threads and only put events on a queue; all bookkeeping
+    happens here, the way the GUI does it on its event loop.
+    """
+
+    def __init__(self, download_path, max_concurrent, list_only=False, remux=False, variant_policy=None):
+        self.download_path = download_path
+        self.remux = remux
+        self.variant_policy = variant_policy or VariantPolicy()
+        self.list_only = list_only
+        self.platform_manager = get_platform_manager()
+        self.events = queue.Queue()
+        self.board = ProgressBoard()
+        # Episodes next in line are resolved while the running ones download
+        self.prefetcher = Prefetcher()
+        self.scheduler = DownloadScheduler(self.start_download, max_concurrent, prepare_job=self.prepare_download)
+        self.scrape_engine = None
+        self.scrapes_running = 0
+        self.next_job_id = 1
+        self.jobs = {}  # job ID: video dict
+        self.tasks = {}  # job ID: running DownloadTask
+        self.seen_urls = set()
+        self.completed = 0
+        self.failed = 0
+
+    def add_url(self, url, scrape=True):
+        platform = self.platform_manager.get_platform_for_url(url)
+        if not scrape or not platform:
+            # An episode page or a direct media URL: download as is
+            self.add_videos([{"title": title_from_url(url), "url": url,
+                              "platform": type(platform).__name__.replace("Platform", "") if platform else "Direct"}])
+            return
+        if self.scrape_engine is None:
+            self.scrape_engine = ScrapeEngine()
+        self.scrapes_running += 1
+        self.scrape_engine.scrap(platform, url,
+                                 on_batch=lambda u, videos: self.events.put(("batch", u, videos)),
+                                 on_done=lambda u, videos: self.events.put(("scraped", u, videos)),
+                                 on_error=lambda u, message: self.events.put(("scrape_failed", u, message)),
+                                 on_status=lambda u, message: print(f"[{u}] {message}", flush=True))
+
+    def add_videos(self, videos):
+        for video in videos:
+            if video['url'] in self.seen_urls:
+                continue
+            self.seen_urls.add(video['url'])
+            if self.list_only:
+                print(f"{video['title']}\t{video['url']}", flush=True)
+                continue
+            job_id = self.next_job_id
+            self.next_job_id += 1
+            self.jobs[job_id] = video
+            self.scheduler.enqueue(job_id, video)
+
+    def prepare_download(self, job_id, video):
+        self.prefetcher.submit(job_id, lambda: DownloadTask(job_id, video, self.download_path,
+                                                            variant_policy=self.variant_policy).prepare())
+
+    def start_download(self, job_id, video):
+        """Called by the scheduler when a slot frees up."""
+        task = DownloadTask(job_id, video, self.download_path, progress_board=self.board, remux=self.remux,
+                            variant_policy=self.variant_policy, prefetched=self.prefetcher.take(job_id),
+                            on_finished=lambda j, status: self.events.put(("finished", j, status)),
+                            on_error=lambda j, message: self.events.put(("error", j, message)))
+        self.tasks[job_id] = task
+        print(f"[{job_id}] Starting {video['title']}", flush=True)
+        task.start()
+        return task
+
+    def busy(self):
+        active, waiting = self.scheduler.counts()
+        return self.scrapes_running or active or waiting or not self.events.empty()
+
+    def run(self):
+        """Processes events until every scrape and download is done. Returns the exit code."""
+        last_report = time.monotonic()
+        try:
+            while self.busy():
+                try:
+                    self.handle(*self.events.get(timeout=REPORT_INTERVAL))
+                except queue.Empty:
+                    pass
+                if time.monotonic() - last_report >= REPORT_INTERVAL:
+                    self.report_progress()
+                    last_report = time.monotonic()
+        except KeyboardInterrupt:
+            print("Interrupted, keeping partial downloads for the next run...", flush=True)
+            for task in list(self.tasks.values()):
+                task.pause()
+            for task in list(self.tasks.values()):
+                task.wait(5)
+            return 130
+        finally:
+            self.prefetcher.shutdown()
+            if self.scrape_engine:
+                self.scrape_engine.shutdown()
+
+        if not self.list_only:
+            print(f"Done: {self.completed} completed, {self.failed} failed.", flush=True)
+        return 1 if self.failed else 0
+
+    def handle(self, kind, key, value):
+        if kind == "batch":
+            self.add_videos(value)
+        elif kind == "scraped":
+            self.scrapes_running -= 1
+            print(f"[{key}] Found {len(value)} videos", flush=True)
+        elif kind == "scrape_failed":
+            self.scrapes_running -= 1
+            self.failed += 1
+            print(f"[{key}] Scrape failed: {value}", flush=True)
+        elif kind in ("finished", "error"):
+            title = self.jobs[key]['title']
+            task = self.tasks.get(key)
+            if task and task.variant:
+                title += f" ({task.variant.label()})"
+            if kind == "error":
+                self.failed += 1
+                print(f"[{key}] Error: {title}: {value}", flush=True)
+            else:
+                self.completed += value == "Completed"
+                print(f"[{key}] {value}: {title}", flush=True)
+            self.board.remove(key)
+            self.tasks.pop(key, None)
+            self.scheduler.job_done(key)
+
+    def report_progress(self):
+        for job_id, percent, speed, eta, total_bytes in self.board.drain():
+            if job_id not in self.tasks:
+                continue
+            size = f" of {format_bytes(total_bytes)}" if total_bytes else ""
+            eta_text = f" ETA {format_eta(eta)}" if eta is not None else ""
+            print(f"[{job_id}] {percent:3d}%{size} {format_bytes(speed)}/s{eta_text}", flush=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Scrape and download videos without the GUI.")
+    parser.add_argument("urls", nargs="*", help="series, episode or media URLs")
+    parser.add_argument("-i", "--input", action="append", metavar="FILE",
+                        help="file with one URL per line ('-' for stdin); may be repeated")
+    parser.add_argument("-o", "--output", default="downloads", help="download folder (default: downloads)")
+    parser.add_argument("-j", "--concurrent", type=int, default=3, help="simultaneous downloads (default: 3)")
+    parser.add_argument("--limit", default="", help="total speed limit, e.g. 2M or 500K (default: unlimited)")
+    parser.add_argument("--host-limit", default="", help="speed limit per host")
+    parser.add_argument("--episodes", action="store_true",
+                        help="treat URLs as episode or media URLs and download them without scraping")
+    parser.add_argument("--remux", action="store_true",
+                        help="write HLS downloads as real MP4 files instead of MPEG-TS (no re-encoding)")
+    parser.add_argument("--quality", default="best",
+                        help="HLS variant: best, a height cap such as 720p, or auto to step down "
+                             "when the connection is too slow (e.g. 'auto 720p'); default: best")
+    parser.add_argument("--list", action="store_true", help="only print the scraped episodes")
+    parser.add_argument("--metrics-port", type=int, default=int(METRICS_PORT or 0),
+                        help="serve Prometheus metrics on this local port (default: $SDM_METRICS_PORT, off)")
+    args = parser.parse_args(argv)
+
+    urls = read_urls(args)
+    if not urls:
+        parser.error("no URLs given")
+    try:
+        limiter = get_rate_limiter()
+        limiter.set_rate(parse_rate(args.limit))
+        limiter.set_host_rate(parse_rate(args.host_limit))
+        variant_policy = VariantPolicy(*parse_quality(args.quality))
+    except ValueError as e:
+        parser.error(str(e))
+
+    if args.metrics_port:
+        start_metrics_server(args.metrics_port)
+    runner = HeadlessRunner(args.output, max(1, args.concurrent), list_only=args.list, remux=args.remux,
+                            variant_policy=variant_policy)
+    for url in urls:
+        runner.add_url(url, scrape=not args.episodes)
+    return runner.run()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,105 +1,214 @@
 import os
 import time
-import cloudscraper
-from PyQt5.QtCore import QThread, pyqtSignal
-from core.manager import PlatformManager
-
-class DownloadWorker(QThread):
-    progress = pyqtSignal(int, int, int) # row_id, percentage, speed (kbps)
-    finished = pyqtSignal(int, str) # row_id, status message
-    error = pyqtSignal(int, str) # row_id, error message
-
-    def __init__(self, row_id, video_data, download_path):
-        super().__init__()
-        self.row_id = row_id
+import threading
+from contextlib import closing
+from tempfile import SpooledTemporaryFile
+from concurrent.futures import ThreadPoolExecutor, wait
+from core.manager import get_platform_manager, url_host
+from core.journal import SegmentJournal, PartialDownload
+from core.session import get_session
+from core.ratelimit import get_rate_limiter
+from core.resolve_cache import get_resolve_cache, token_expiry, EXPIRY_MARGIN, DEFAULT_TTL
+from core.prefetch import Prefetched, Prefetcher
+from core.metrics import get_metrics
+from core.progress import ProgressBoard, format_bytes
+from core.remux import TsRemuxer, RemuxError
+from core.hls import parse_master_playlist, parse_media_playlist, KeyStore, VariantPolicy
+
+# Number of HLS segments fetched in parallel per download
+DEFAULT_SEGMENT_WORKERS = 8
+
+# Parallel byte-range connections for direct files, and the smallest file worth splitting
+DEFAULT_RANGE_CONNECTIONS = 4
+MIN_RANGE_SPLIT = 4 * 1024 * 1024
+
+# HLS memory per segment worker: one reusable read buffer, plus the in-memory
+# part of each segment fetched ahead of its turn (the rest goes to a temp file)
+SEGMENT_BUFFER_SIZE = 64 * 1024
+SEGMENT_SPOOL_MEMORY = 512 * 1024
+
+# Attempts per HLS segment, and the wait before the first retry (doubled after each)
+SEGMENT_ATTEMPTS = 3
+SEGMENT_RETRY_DELAY = 0.5
+
+# Minimum seconds between progress signals when no shared ProgressBoard is used
+PROGRESS_INTERVAL = 0.25
+
+
+class SegmentSink:
+    """
+    Where one HLS segment is fetched to. Data is spooled (memory up to
+    SEGMENT_SPOOL_MEMORY, then disk) while earlier segments are still being
+    written; once the writer claims the sink as the next one in order, the
+    spooled part is moved to the output and the rest goes there directly.
+    Only the fetching thread writes to a sink; the writer waits meanwhile.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.spool = SpooledTemporaryFile(max_size=SEGMENT_SPOOL_MEMORY)
+        self.outfile = None
+        self.start = 0  # Output offset of the segment, once claimed
+        self.size = 0
+
+    def write(self, data):
+        with self.lock:
+            (self.outfile or self.spool).write(data)
+            self.size += len(data)
+
+    def restart(self):
+        """Drops what a failed attempt wrote."""
+        with self.lock:
+            target = self.outfile or self.spool
+            target.seek(self.start if self.outfile else 0)
+            target.truncate()
+            self.size = 0
+
+    def claim(self, outfile, copy):
+        """Moves the spooled data to the end of `outfile` with copy(spool, outfile) and writes the rest there."""
+        with self.lock:
+            self.start = outfile.tell()
+            self.spool.seek(0)
+            copy(self.spool, outfile)
+            self.spool.close()
+            self.outfile = outfile
+
+    def read(self):
+        """The whole segment, if it was not claimed."""
+        with self.lock:
+            self.spool.seek(0)
+            return self.spool.read()
+
+    def close(self):
+        with self.lock:
+            self.spool.close()
+
+
+class DownloadTask:
+    """
+    Downloads one video. Has no GUI dependency: results are reported through
+    plain callbacks, called from the thread running the task:
+
+        on_progress(job_id, percent, speed_kbps)
+        on_finished(job_id, status)  # "Completed", "Paused" or "Cancelled"
+        on_error(job_id, message)
+
+    run() blocks; start() runs it on a background thread.
+    """
+
+    def __init__(self, job_id, video_data, download_path, segment_workers=DEFAULT_SEGMENT_WORKERS,
+                 range_connections=DEFAULT_RANGE_CONNECTIONS, progress_board=None, remux=False,
+                 variant_policy=None, prefetched=None, on_progress=None, on_finished=None, on_error=None):
+        self.job_id = job_id
         self.video_data = video_data
         self.download_path = download_path
-        self.platform_manager = PlatformManager()
+        self.platform_manager = get_platform_manager()
         self.is_cancelled = False
+        self.is_paused = False
+        self.on_progress = on_progress
+        self.on_finished = on_finished
+        self.on_error = on_error
+        self.thread = None
+
+        # In-flight segments; the reorder buffer holds at most twice this many
+        self.segment_workers = max(1, int(segment_workers))
+        # Parallel byte-range connections for direct files
+        self.range_connections = max(1, int(range_connections))
+        # Write HLS downloads as fragmented MP4 instead of the raw transport stream
+        self.remux = remux
+        # Which variant of a master playlist to download; `variant` is the one in use
+        self.variant_policy = variant_policy or VariantPolicy()
+        self.variant = None
+        # One read buffer per thread, reused for every segment it handles
+        self.buffers = threading.local()
         
-        # Initialize CloudScraper
-        self.scraper = cloudscraper.create_scraper(
-            browser={
-                'browser': 'chrome',
-                'platform': 'windows',
-                'mobile': False
-            }
-        )
-
-    def load_cookies(self, domain):
-        cookie_file = os.path.join("config", f"{domain}_cookies.txt")
-        if not os.path.exists(cookie_file):
+        # Per-job request headers; connections come from the shared session pool
+        self.headers = {
+            'Referer': video_data['url'],
+            'Origin': 'https://www.dramaboxdb.com'
+        }
+        # Future of a Prefetched from prepare() run ahead of time, and the
+        # playlist texts it fetched (url: text), used once each
+        self.prefetched = prefetched
+        self.playlists = {}
+        self.rate_limiter = get_rate_limiter()
+        self.resolve_cache = get_resolve_cache()
+
+        # Progress goes to a shared board polled by the UI; without one, the
+        # task keeps its own and calls on_progress at most every PROGRESS_INTERVAL
+        self.progress_board = progress_board
+        self.own_board = ProgressBoard() if progress_board is None else None
+        self.last_progress_emit = 0.0
+
+        # Request timings, retries and errors by host; this job's own figures
+        # are read from `started` and `bytes_done` while it runs
+        self.metrics = get_metrics()
+        self.platform_name = video_data.get('platform') or "Unknown"
+        self.started = None
+        self.bytes_done = 0
+
+    def emit(self, callback, *args):
+        if callback:
+            callback(self.job_id, *args)
+
+    def finish(self, status):
+        """Reports the end of the download: "Completed", "Paused" or "Cancelled"."""
+        self.metrics.download_ended(self, status)
+        self.emit(self.on_finished, status)
+
+    def fail(self, message):
+        self.metrics.download_ended(self, "Error")
+        self.emit(self.on_error, message)
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, name=f"Download-{self.job_id}", daemon=True)
+        self.thread.start()
+
+    def wait(self, timeout=None):
+        """Waits for a started task to return; True if it has."""
+        if self.thread:
+            self.thread.join(timeout)
+            return not self.thread.is_alive()
+        return True
+
+    def http_get(self, url, headers=None, **kwargs):
+        """GET through the shared session for the URL's host, with this job's headers."""
+        merged = dict(self.headers)
+        if headers:
+            merged.update(headers)
+        return get_session(url).get(url, headers=merged, **kwargs)
+
+    def report_progress(self, fraction, bytes_done, total_bytes=None):
+        """Records progress; cheap enough to call for every chunk."""
+        self.bytes_done = bytes_done
+        if self.progress_board is not None:
+            self.progress_board.update(self.job_id, fraction, bytes_done, total_bytes)
             return
-            
-        try:
-            cookies = []
-            with open(cookie_file, 'r') as f:
-                for line in f:
-                    if line.startswith('#') or not line.strip():
-                        continue
-                    parts = line.strip().split('\t')
-                    if len(parts) >= 7:
-                        # domain, flag, path, secure, expiration, name, value
-                        # CloudScraper/Requests cookie dict
-                        self.scraper.cookies.set(parts[5], parts[6], domain=parts[0], path=parts[2])
-                        cookies.append(f"{parts[5]}={parts[6]}")
-            
-            if cookies:
-                # Also force header just in case
-                self.scraper.headers.update({'Cookie': "; ".join(cookies)})
-                print(f"[DEBUG] Loaded cookies for {domain}")
-                
-        except Exception as e:
-            print(f"[WARN] Failed to load cookies: {e}")
+        self.own_board.update(self.job_id, fraction, bytes_done, total_bytes)
+        now = time.monotonic()
+        if now - self.last_progress_emit >= PROGRESS_INTERVAL or fraction >= 1:
+            self.last_progress_emit = now
+            for _, percent, speed, _, _ in self.own_board.drain():
+                self.emit(self.on_progress, percent, int(speed / 1024))
 
     def run(self):
+        self.started = time.monotonic()
+        self.metrics.download_started(self)
         try:
             url = self.video_data['url']
             title = self.video_data['title']
-            
-            # Configure Headers
-            self.scraper.headers.update({
-                'Referer': url,
-                'Origin': 'https://www.dramaboxdb.com'
-            })
-
-            # Load Cookies
-            if "dramaboxdb.com" in url:
-                self.load_cookies("www.dramaboxdb.com")
-
-            # 1. Resolve true video URL
-            if "dramaboxdb.com" in url:
-                print(f"[DEBUG] Fetching Dramabox page with cloudscraper: {url}")
-                try:
-                    r_page = self.scraper.get(url)
-                    if r_page.status_code != 200:
-                        raise Exception(f"Failed to load page: {r_page.status_code}")
-                    
-                    import re
-                    html = r_page.text
-                    # Updated Regex: Capture everything until the closing quote, ensuring it contains .m3u8
-                    # This preserves query parameters (tokens)
-                    video_match = re.search(r'(https?(?::|%3A)(?:/|%2F|\\/){2}[^"\'\s<>]+?\.m3u8[^"\'\s<>]*)', html, re.IGNORECASE)
-                    
-                    if video_match:
-                        found_url = video_match.group(1)
-                        found_url = found_url.replace(r'\\/', '/')
-                        found_url = found_url.replace('%3A', ':').replace('%2F', '/')
-                        real_url = found_url
-                        print(f"[DEBUG] Resolved m3u8: {real_url}")
-                    else:
-                        print("[WARN] m3u8 not found in page, falling back...")
-                        platform = self.platform_manager.get_platform_for_url(url)
-                        real_url = platform.resolve_video_url(url) if platform else url
-                except Exception as e:
-                    print(f"[ERROR] Page fetch error: {e}")
-                    raise e
+
+            # 1. Resolve true video URL, unless it was prepared while the job was queued
+            prefetched = Prefetcher.usable(self.prefetched) if self.prefetched else None
+            self.prefetched = None
+            if prefetched and prefetched.media_url:
+                real_url = prefetched.media_url
+                self.playlists = dict(prefetched.playlists)
             else:
-                platform = self.platform_manager.get_platform_for_url(url)
-                real_url = platform.resolve_video_url(url) if platform else url
-                if not real_url:
-                    self.error.emit(self.row_id, "Failed to resolve video URL")
-                    return
+                real_url = self.resolve_url(url)
+            if not real_url:
+                self.fail("Failed to resolve video URL")
+                return
 
             # 2. Setup path
             safe_title = "".join([c for c in title if c.isalpha() or c.isdigit() or c==' ']).rstrip()
@@ -110,7 +219,7 @@ class DownloadWorker(QThread):
                 os.makedirs(self.download_path)
 
             # 3. Download
-            print(f"[DEBUG] Downloading with cloudscraper: {real_url}")
+            print(f"[DEBUG] Downloading: {real_url}")
             
             if ".m3u8" in real_url:
                 self.download_m3u8(real_url, filepath)
@@ -119,115 +228,526 @@ class DownloadWorker(QThread):
 
         except Exception as e:
             print(f"[ERROR] Download failed: {str(e)}")
-            self.error.emit(self.row_id, str(e))
+            if "403" in str(e):
+                # The cached token was rejected; resolve the page again next time
+                self.resolve_cache.invalidate(self.video_data['url'])
+            self.fail(str(e))
+
+    def resolve_url(self, url):
+        """Turns an episode page URL into the media URL, using the resolve cache when possible."""
+        cached = self.resolve_cache.get(url)
+        if cached:
+            print(f"[DEBUG] Resolve cache hit: {cached}")
+            self.metrics.inc("sdm_resolves_total", platform=self.platform_name, source="cache")
+            return cached
+
+        # Scraped in bulk together with its stream URL (e.g. Dramabox __NEXT_DATA__)
+        stream_url = self.video_data.get('stream_url')
+        if stream_url and (token_expiry(stream_url) or 0) - EXPIRY_MARGIN > time.time():
+            self.resolve_cache.put(url, stream_url)
+            self.metrics.inc("sdm_resolves_total", platform=self.platform_name, source="scraped")
+            return stream_url
+
+        platform = self.platform_manager.get_platform_for_url(url)
+        if not platform:
+            return url
+        started = time.perf_counter()
+        real_url = platform.resolve_video_url(url)
+        self.metrics.observe("sdm_resolve_seconds", time.perf_counter() - started, platform=self.platform_name)
+        self.metrics.inc("sdm_resolves_total", platform=self.platform_name, source="page" if real_url else "failed")
+
+        if real_url and real_url != url:
+            self.resolve_cache.put(url, real_url)
+        return real_url
+
+    def prepare(self):
+        """
+        Does the round-trips a download starts with: resolves the episode page
+        and, for HLS, fetches the master playlist and the media playlist of the
+        variant the policy would pick. Returns a Prefetched for a later
+        DownloadTask(prefetched=...) of the same job; meant for a Prefetcher.
+        """
+        media_url = self.resolve_url(self.video_data['url'])
+        playlists = {}
+        expiries = [token_expiry(media_url)] if media_url else []
+        if media_url and ".m3u8" in media_url:
+            playlists[media_url] = playlist = self.fetch_playlist(media_url)
+            variants = parse_master_playlist(playlist, media_url) if "#EXT-X-STREAM-INF" in playlist else []
+            if variants:
+                variant = self.variant_policy.choose(variants, url_host(media_url))
+                playlists[variant.url] = self.fetch_playlist(variant.url)
+                expiries.append(token_expiry(variant.url))
+        # Playlists without a signed URL are only trusted as long as the resolve cache would be
+        expires = min((e for e in expiries if e), default=int(time.time()) + DEFAULT_TTL)
+        return Prefetched(media_url, playlists, expires)
+
+    def fetch_playlist(self, url):
+        playlist = self.playlists.pop(url, None)
+        if playlist is not None:
+            return playlist
+        started = time.perf_counter()
+        response = self.http_get(url)
+        host = url_host(url)
+        self.metrics.observe("sdm_playlist_seconds", time.perf_counter() - started, host=host)
+        self.metrics.response(host, "playlist", response.status_code)
+        if response.status_code != 200:
+            raise Exception(f"Failed to fetch m3u8: HTTP {response.status_code} - {response.reason}")
+        return response.text
 
     def download_m3u8(self, url, filepath):
         try:
-            response = self.scraper.get(url)
-            if response.status_code != 200:
-                raise Exception(f"Failed to fetch m3u8: HTTP {response.status_code} - {response.reason}")
-                
-            playlist = response.text
-            base_url = url.rsplit('/', 1)[0]
-            lines = playlist.splitlines()
-            
-            # Master Playlist Logic
-            if "#EXT-X-STREAM-INF" in playlist:
-                best_bandwidth = -1
-                best_url = None
-                for i, line in enumerate(lines):
-                    if line.startswith("#EXT-X-STREAM-INF"):
-                        bw = 0
-                        if "BANDWIDTH=" in line:
-                            try:
-                                bw = int(line.split("BANDWIDTH=")[1].split(",")[0])
-                            except: pass
-                        if i + 1 < len(lines):
-                            stream_url = lines[i+1].strip()
-                            if stream_url and not stream_url.startswith("#"):
-                                if not stream_url.startswith("http"):
-                                    stream_url = f"{base_url}/{stream_url}"
-                                if bw > best_bandwidth:
-                                    best_bandwidth = bw
-                                    best_url = stream_url
-                if best_url:
-                    self.download_m3u8(best_url, filepath)
-                    return
-
-            # Segments
-            segments = []
-            for line in lines:
-                line = line.strip()
-                if line and not line.startswith('#'):
-                    if line.startswith('http'):
-                        segments.append(line)
-                    else:
-                        segments.append(f"{base_url}/{line}")
+            playlist = self.fetch_playlist(url)
+            host = url_host(url)
+            # Remuxed and raw downloads keep separate temp files, so a resume never mixes them
+            temp_file = filepath + (".fmp4" if self.remux else ".ts")
+            journal = SegmentJournal(temp_file)
+
+            # Master playlist: the policy picks a variant, but a partial download
+            # continues on the one its data came from
+            variants = parse_master_playlist(playlist, url) if "#EXT-X-STREAM-INF" in playlist else []
+            media_url = url
+            if variants:
+                started = journal.started_from([v.url for v in variants])
+                self.variant = (next((v for v in variants if v.url == started), None)
+                                or self.variant_policy.choose(variants, host))
+                print(f"[DEBUG] Variant {self.variant.label()} of {len(variants)} ({self.variant_policy})")
+                media_url = self.variant.url
+                playlist = self.fetch_playlist(media_url)
+
+            # Segments, and the AES-128 key of each encrypted one
+            segments, keys = parse_media_playlist(playlist, media_url)
+            key_store = KeyStore(self.fetch_key)
             
             if not segments:
                 raise Exception("No segments found")
 
             total_segments = len(segments)
-            temp_file = filepath + ".ts"
-            
-            with open(temp_file, 'wb') as outfile:
-                start_time = time.time()
-                downloaded_bytes = 0
-                for i, segment_url in enumerate(segments):
-                    if self.is_cancelled:
-                        outfile.close(); os.remove(temp_file)
-                        self.finished.emit(self.row_id, "Cancelled")
-                        return
 
-                    for attempt in range(3):
-                        try:
-                            r = self.scraper.get(segment_url, stream=True, timeout=15)
-                            if r.status_code != 200: raise Exception(f"HTTP {r.status_code}")
-                            content = r.content
-                            outfile.write(content)
-                            downloaded_bytes += len(content)
-                            break
-                        except Exception as e:
-                            if attempt == 2:
-                                print(f"[WARN] Segment {i} failed: {e}")
-                                if "403" in str(e): raise Exception("403 Forbidden")
-                    
-                    # Progress
-                    percent = int(((i + 1) / total_segments) * 100)
-                    elapsed = time.time() - start_time
-                    speed = int((downloaded_bytes / 1024) / elapsed) if elapsed > 0 else 0
-                    self.progress.emit(self.row_id, percent, speed)
-            
+            # Pick up where a crashed or failed attempt stopped
+            start_index, offset = journal.resume(media_url, segments)
+            if start_index:
+                print(f"[DEBUG] Resuming at segment {start_index}/{total_segments}")
+
+            # Segments are fetched concurrently but written strictly in playlist order.
+            # `pending` is the reorder buffer: index -> (future, sink), bounded by
+            # `window`. The segment being waited for streams into the output; those
+            # ahead of it wait in their sink's spool, not as one big bytes object.
+            window = self.segment_workers * 2
+            stop = threading.Event()
+            pool = ThreadPoolExecutor(max_workers=self.segment_workers)
+            pending = {}
+            next_submit = start_index
+            remuxer = TsRemuxer(write_init=not start_index) if self.remux else None
+            remux_error = None
+            # Download speed is measured over `window` segments at a time; a fragmented
+            # MP4 cannot change variants after its header, so only raw streams step down
+            can_step_down = len(variants) > 1 and self.variant_policy.adaptive and not remuxer
+            measured_from = None  # (segment, time, offset) the current measurement started at
+
+            try:
+                with open(temp_file, 'r+b' if start_index else 'wb') as outfile:
+                    outfile.seek(offset)
+                    outfile.truncate()
+                    for i in range(start_index, total_segments):
+                        while next_submit < total_segments and next_submit - i < window:
+                            sink = SegmentSink()
+                            future = pool.submit(self.fetch_segment, next_submit, segments[next_submit], sink, stop,
+                                                 keys[next_submit], key_store)
+                            pending[next_submit] = (future, sink)
+                            next_submit += 1
+
+                        future, sink = pending.pop(i)
+                        with closing(sink):
+                            if not remuxer:
+                                sink.claim(outfile, self.copy_spool)
+                            fetched = future.result()
+                            # Data of an unfinished segment past `offset` is cut off on resume
+                            if self.is_cancelled or self.is_paused:
+                                break
+                            if not fetched:
+                                raise Exception(f"Segment {i} was not fetched")
+
+                            if remuxer:
+                                # A fragment needs the whole segment's sample table
+                                try:
+                                    content = remuxer.remux(sink.read(), i + 1)
+                                except RemuxError as e:
+                                    # Falling back is only possible before this run wrote any fragment
+                                    if i != start_index:
+                                        raise Exception(f"Remux failed at segment {i}: {e}")
+                                    remux_error = e
+                                    break
+                                outfile.write(content)
+                                length = len(content)
+                            else:
+                                length = sink.size
+                        if length:
+                            outfile.flush()
+                            journal.record(i, offset, length)
+                            offset += length
+
+                        self.report_progress((i + 1) / total_segments, offset)
+
+                        # Speed since the first written segment, so connection setup does not count
+                        now = time.monotonic()
+                        if measured_from is None:
+                            measured_from = (i + 1, now, offset)
+                        elif variants and (i + 1 - measured_from[0] >= window or i + 1 == total_segments):
+                            speed = (offset - measured_from[2]) / max(now - measured_from[1], 1e-3)
+                            self.variant_policy.record_speed(host, speed)
+                            measured_from = (i + 1, now, offset)
+                            lower = self.variant_policy.step_down(variants, self.variant, speed) \
+                                if can_step_down and i + 1 < total_segments else None
+                            if lower:
+                                switched = self.switch_variant(lower, journal, i + 1, total_segments)
+                                if switched:
+                                    print(f"[DEBUG] Stepping down to {lower.label()} at segment {i + 1} "
+                                          f"({format_bytes(speed)}/s)")
+                                    # Segments already requested are from the old variant
+                                    stop.set()
+                                    for future, sink in pending.values():
+                                        future.cancel()
+                                        future.add_done_callback(lambda _, sink=sink: sink.close())
+                                    stop = threading.Event()
+                                    pending = {}
+                                    next_submit = i + 1
+                                    media_url, segments, keys = switched
+                                    key_store = KeyStore(self.fetch_key)
+                                else:
+                                    can_step_down = False
+            finally:
+                stop.set()
+                pool.shutdown(wait=True, cancel_futures=True)
+                for future, sink in pending.values():
+                    sink.close()
+                journal.close()
+
+            if remux_error:
+                # The stream (or, when resuming, its next segment) cannot be remuxed;
+                # start over keeping the stream as it is
+                print(f"[WARN] Cannot remux to MP4 ({remux_error}), saving the transport stream")
+                os.remove(temp_file)
+                journal.discard()
+                self.remux = False
+                self.download_m3u8(url, filepath)
+                return
+
+            if self.is_cancelled:
+                os.remove(temp_file)
+                journal.discard()
+                self.finish("Cancelled")
+                return
+            if self.is_paused:
+                self.finish("Paused")
+                return
+
             if os.path.exists(filepath): os.remove(filepath)
             os.rename(temp_file, filepath)
-            self.finished.emit(self.row_id, "Completed")
+            journal.discard()
+            self.finish("Completed")
 
         except Exception as e:
             raise e
 
+    def switch_variant(self, variant, journal, completed, total_segments):
+        """
+        Continues the download from segment `completed` on another variant.
+        Returns its (url, segments, keys), or None if its segments do not line
+        up with the current ones.
+        """
+        try:
+            segments, keys = parse_media_playlist(self.fetch_playlist(variant.url), variant.url)
+        except Exception as e:
+            print(f"[WARN] Cannot switch to {variant.label()}: {e}")
+            return None
+        if len(segments) != total_segments:
+            print(f"[WARN] Cannot switch to {variant.label()}: its segments do not match")
+            return None
+        journal.switch(variant.url, segments, completed)
+        self.variant = variant
+        return variant.url, segments, keys
+
+    def segment_buffer(self):
+        """This thread's reusable read buffer, as a memoryview."""
+        view = getattr(self.buffers, "view", None)
+        if view is None:
+            view = self.buffers.view = memoryview(bytearray(SEGMENT_BUFFER_SIZE))
+        return view
+
+    @staticmethod
+    def body_reader(response):
+        """
+        readinto() for a streamed response body. An uncompressed body is read
+        straight from the http.client response into the caller's buffer (urllib3's
+        readinto reads into a new bytes object and copies it), and the connection
+        is handed back to the pool once the body has been read to the end.
+        """
+        raw = response.raw
+        fp = getattr(raw, "_fp", None)
+        if response.headers.get('Content-Encoding') or not hasattr(fp, "readinto"):
+            # Decoding needs urllib3, one copy per chunk
+            raw.decode_content = True
+            return raw.readinto
+
+        def readinto(view):
+            count = fp.readinto(view)
+            if not count:
+                # http.client takes a connection closed early for the end of the body
+                if fp.length:
+                    raise Exception(f"Connection closed with {fp.length} bytes of the body missing")
+                # urllib3 never saw the body; without this it closes the connection
+                raw.release_conn()
+            return count
+        return readinto
+
+    def fetch_segment(self, index, segment_url, sink, stop, key=None, key_store=None):
+        """
+        Fetches one segment with retries into `sink`, reading through this
+        thread's reusable buffer and decrypting in place if the segment has a key.
+        Returns the sink, or None if stopped. Raises once every attempt failed,
+        so the download stops at the gap and keeps its journal for the next run
+        instead of skipping the segment.
+        """
+        view = self.segment_buffer()
+        host = url_host(segment_url)
+        for attempt in range(SEGMENT_ATTEMPTS):
+            if attempt:
+                if stop.wait(SEGMENT_RETRY_DELAY * 2 ** (attempt - 1)):
+                    return None
+                self.metrics.inc("sdm_retries_total", host=host, kind="segment")
+            if self.is_cancelled or self.is_paused or stop.is_set():
+                return None
+            # Outside the retry handling: without the key the segment is useless
+            decryptor = key_store.decryptor(key) if key else None
+            sink.restart()
+            try:
+                started = time.perf_counter()
+                with self.http_get(segment_url, stream=True, timeout=15) as r:
+                    ttfb = time.perf_counter() - started
+                    self.metrics.response(host, "segment", r.status_code)
+                    if r.status_code != 200: raise Exception(f"HTTP {r.status_code}")
+                    readinto = self.body_reader(r)
+                    carry = 0  # Undecrypted tail kept at the start of the buffer
+                    while True:
+                        if self.is_cancelled or self.is_paused or stop.is_set():
+                            return None
+                        count = readinto(view[carry:])
+                        if not count:
+                            break
+                        self.rate_limiter.throttle(segment_url, count)
+                        filled = carry + count
+                        ready = decryptor.decrypt(view, filled) if decryptor else filled
+                        sink.write(view[:ready])
+                        carry = filled - ready
+                        if carry:
+                            view[:carry] = view[ready:filled]
+                    if decryptor:
+                        sink.write(decryptor.finish(view[:carry]))
+                self.metrics.request_done(host, "segment", ttfb, time.perf_counter() - started - ttfb, sink.size)
+                return sink
+            except Exception as e:
+                if attempt == SEGMENT_ATTEMPTS - 1:
+                    self.metrics.inc("sdm_request_failures_total", host=host, kind="segment")
+                    if "403" in str(e): raise Exception("403 Forbidden")
+                    raise Exception(f"Segment {index} failed: {e}")
+
+    def copy_spool(self, spool, outfile):
+        """Copies a spooled segment into the output through this thread's reusable buffer. Returns its size."""
+        view = self.segment_buffer()
+        total = 0
+        while True:
+            count = spool.readinto(view)
+            if not count:
+                return total
+            outfile.write(view[:count])
+            total += count
+
+    def fetch_key(self, key_url):
+        """Downloads an HLS AES-128 key (called once per key URI by KeyStore)."""
+        for attempt in range(3):
+            try:
+                r = self.http_get(key_url, timeout=15)
+                if r.status_code != 200: raise Exception(f"HTTP {r.status_code}")
+                return r.content
+            except Exception as e:
+                if attempt == 2:
+                    raise Exception(f"Failed to fetch key {key_url}: {e}")
+
     def download_file(self, url, filepath):
         try:
-            with self.scraper.get(url, stream=True) as response:
+            part = PartialDownload(filepath)
+            with self.http_get(url, stream=True) as response:
                 response.raise_for_status()
                 if 'text/html' in response.headers.get('Content-Type', ''):
                     raise Exception("URL returned HTML.")
                 
                 total_size = int(response.headers.get('Content-Length', 0))
-                downloaded = 0
-                with open(filepath, 'wb') as f:
-                    for chunk in response.iter_content(chunk_size=8192):
-                        if self.is_cancelled:
-                            f.close(); os.remove(filepath)
-                            self.finished.emit(self.row_id, "Cancelled")
+                validators = {
+                    "etag": response.headers.get('ETag'),
+                    "last_modified": response.headers.get('Last-Modified'),
+                    "size": total_size,
+                }
+                ranged = (total_size > 0
+                          and response.headers.get('Accept-Ranges', '').lower() == 'bytes'
+                          and not response.headers.get('Content-Encoding'))
+
+                if ranged:
+                    ranges = part.resume(url, validators)
+                    if ranges is not None:
+                        print(f"[DEBUG] Resuming {part.path} at {part.downloaded()}/{total_size} bytes")
+                    else:
+                        # Split across several connections when the file is big enough
+                        connections = self.range_connections if total_size >= MIN_RANGE_SPLIT else 1
+                        ranges = part.start(url, validators, self.split_ranges(total_size, connections))
+
+                    if len(ranges) > 1 or part.downloaded():
+                        response.close()
+                        if self.download_file_ranges(url, part, total_size):
                             return
-                        f.write(chunk)
-                        downloaded += len(chunk)
-                        if total_size:
-                            percent = int((downloaded / total_size) * 100)
-                            self.progress.emit(self.row_id, percent, 0)
-            self.finished.emit(self.row_id, "Completed")
+                        print("[WARN] Range requests not honoured, falling back to a single stream")
+                        self.download_file_single(url, part)
+                        return
+                else:
+                    part.start(url, {}, [(0, total_size - 1)])
+
+                self.stream_response(response, part, total_size)
         except Exception as e:
             raise e
 
+    @staticmethod
+    def split_ranges(total_size, connections):
+        part_size = -(-total_size // connections)
+        return [(start, min(start + part_size, total_size) - 1)
+                for start in range(0, total_size, part_size)]
+
+    def download_file_single(self, url, part):
+        with self.http_get(url, stream=True) as response:
+            response.raise_for_status()
+            total_size = int(response.headers.get('Content-Length', 0))
+            part.start(url, {}, [(0, total_size - 1)])
+            self.stream_response(response, part, total_size)
+
+    def stream_response(self, response, part, total_size):
+        """Streams a whole response body into the .part file from offset 0."""
+        current = part.ranges[0]
+        last_save = time.time()
+        with open(part.path, 'r+b', buffering=0) as f:
+            for chunk in response.iter_content(chunk_size=65536):
+                if self.is_cancelled or self.is_paused:
+                    break
+                self.rate_limiter.throttle(response.url, len(chunk))
+                f.write(chunk)
+                current[2] += len(chunk)
+                if total_size:
+                    self.report_progress(current[2] / total_size, current[2], total_size)
+                if time.time() - last_save > 1:
+                    part.save()
+                    last_save = time.time()
+        self.finish_part(part)
+
+    def download_file_ranges(self, url, part, total_size):
+        """
+        Fetches the remaining part of every range in parallel, each one written
+        at its own offset into the preallocated .part file.
+        Returns False if the server ignored the Range header or the resource
+        changed since the .part file was started.
+        """
+        ranges = [r for r in part.ranges if r[2] <= r[1]]
+        lock = threading.Lock()
+        stop = threading.Event()
+
+        pool = ThreadPoolExecutor(max_workers=max(1, len(ranges)))
+        try:
+            futures = [pool.submit(self.fetch_range, url, part, current, lock, stop, total_size)
+                       for current in ranges]
+            not_done = futures
+            while not_done:
+                done, not_done = wait(not_done, timeout=0.5)
+                for future in done:
+                    if future.result() is False:
+                        stop.set()
+                        part.discard()
+                        return False
+
+                with lock:
+                    part.save()
+        finally:
+            stop.set()
+            pool.shutdown(wait=True, cancel_futures=True)
+            part.save()
+
+        self.finish_part(part)
+        return True
+
+    def fetch_range(self, url, part, current, lock, stop, total_size):
+        """
+        Downloads one [start, end, position] range into the .part file, advancing
+        `position` as bytes hit the disk, and retries from where it stopped.
+        """
+        start, end = current[0], current[1]
+        # If-Range makes the server send the whole (new) file instead of a
+        # partial response if it changed, so stale bytes are never spliced in.
+        validator = part.validators.get("etag")
+        if not validator or validator.startswith("W/"):
+            validator = part.validators.get("last_modified")
+
+        host = url_host(url)
+        for attempt in range(3):
+            if attempt:
+                self.metrics.inc("sdm_retries_total", host=host, kind="range")
+            try:
+                headers = {'Range': f"bytes={current[2]}-{end}"}
+                if validator:
+                    headers['If-Range'] = validator
+                started = time.perf_counter()
+                position = current[2]
+                with self.http_get(url, stream=True, headers=headers, timeout=30) as r:
+                    ttfb = time.perf_counter() - started
+                    self.metrics.response(host, "range", r.status_code)
+                    if r.status_code == 200:
+                        return False
+                    if r.status_code != 206:
+                        raise Exception(f"HTTP {r.status_code}")
+                    with open(part.path, 'r+b', buffering=0) as f:
+                        f.seek(current[2])
+                        for chunk in r.iter_content(chunk_size=65536):
+                            if self.is_cancelled or self.is_paused or stop.is_set():
+                                return None
+                            chunk = chunk[:end + 1 - current[2]]
+                            self.rate_limiter.throttle(url, len(chunk))
+                            f.write(chunk)
+                            with lock:
+                                current[2] += len(chunk)
+                                downloaded = part.downloaded()
+                            self.report_progress(downloaded / total_size, downloaded, total_size)
+                            if current[2] > end:
+                                break
+                if current[2] > end:
+                    self.metrics.request_done(host, "range", ttfb, time.perf_counter() - started - ttfb,
+                                              current[2] - position)
+                    return True
+                raise Exception("Connection closed early")
+            except Exception as e:
+                if attempt == 2:
+                    self.metrics.inc("sdm_request_failures_total", host=host, kind="range")
+                    raise Exception(f"Range {start}-{end} failed: {e}")
+                print(f"[WARN] Range {start}-{end} interrupted at {current[2]}: {e}")
+
+    def finish_part(self, part):
+        """Completes, keeps (paused) or deletes (cancelled) a .part file and reports it."""
+        if self.is_cancelled:
+            part.discard()
+            self.finish("Cancelled")
+        elif self.is_paused:
+            part.save()
+            self.finish("Paused")
+        else:
+            part.complete()
+            self.finish("Completed")
+
     def cancel(self):
         self.is_cancelled = True
+
+    def pause(self):
+        """Stops the download but keeps the partial data so it can be resumed later."""
+        self.is_paused = True
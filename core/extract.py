@@ -0,0 +1,188 @@
+import hashlib
+import os
+import re
+import time
+from urllib.parse import urljoin, urlsplit
+from core.session import get_session
+from core.metrics import get_metrics
+
+# Bytes read from the network per step while scanning a page
+SCAN_CHUNK = 16 * 1024
+# Longest media URL (signed URLs included) that can straddle two chunks
+MAX_URL_LENGTH = 8 * 1024
+
+# Set to a folder to save pages in which no media URL was found
+DEBUG_CAPTURE_DIR = os.environ.get("SDM_DEBUG_HTML")
+
+def _absolute_url_pattern(extensions):
+    return re.compile(rb'https?(?::|%3A)(?:/|%2F|\\/){2}[^"\'\s<>]+?\.(?:' + extensions +
+                      rb')(?![A-Za-z0-9])[^"\'\s<>]*', re.IGNORECASE)
+
+
+# Absolute .m3u8/.mp4 URLs with their query string (tokens), also JSON-escaped (https:\/\/)
+# or percent-encoded (https%3A%2F%2F) as found inside inline scripts
+M3U8_URL = _absolute_url_pattern(rb'm3u8')
+MP4_URL = _absolute_url_pattern(rb'mp4')
+MEDIA_URL = _absolute_url_pattern(rb'mp4|m3u8')
+# Site-relative media paths inside quotes; group 1 is the path
+RELATIVE_MEDIA_URL = re.compile(rb'["\'](/[^"\']+\.(?:mp4|m3u8))["\']', re.IGNORECASE)
+
+
+def normalize_media_url(raw, page_url):
+    """Turns a matched URL (bytes) into a plain absolute URL."""
+    url = raw.decode('utf-8', 'replace')
+    url = url.replace('\\/', '/').replace('\\u0026', '&').replace('&amp;', '&')
+    url = url.replace('%3A', ':').replace('%3a', ':').replace('%2F', '/').replace('%2f', '/')
+    return urljoin(page_url, url) if url.startswith('/') else url
+
+
+class UrlRule:
+    """A media URL pattern; group 1 is used if the pattern has one."""
+
+    def __init__(self, pattern, convert=normalize_media_url):
+        self.pattern = pattern
+        self.convert = convert
+
+
+class BlockRule:
+    """
+    Text between two markers (e.g. an inline JSON script) handed to
+    handler(block_bytes, page_url), which returns a media URL or None.
+    """
+
+    def __init__(self, start, end, handler):
+        self.start = start
+        self.end = end
+        self.handler = handler
+
+
+class MediaUrlExtractor:
+    """
+    Finds a media URL in a page fed to it chunk by chunk, without decoding or
+    keeping the whole page. `rules` are in order of preference; feed() returns
+    a URL as soon as no better rule can still match, so the caller can stop
+    reading. At the end of the page, finish() returns the best match found.
+    """
+
+    def __init__(self, rules, page_url):
+        self.rules = list(rules)
+        self.page_url = page_url
+        self.buffer = bytearray()
+        self.base = 0  # Offset of buffer[0] in the page
+        # Per rule: next offset to scan from, and for blocks the content start
+        self.positions = [0] * len(self.rules)
+        self.block_starts = [None] * len(self.rules)
+        self.exhausted = [False] * len(self.rules)
+        self.found = [None] * len(self.rules)
+
+    def feed(self, chunk):
+        self.buffer += chunk
+        return self._scan(final=False)
+
+    def finish(self):
+        self._scan(final=True)
+        return next((url for url in self.found if url), None)
+
+    def _scan(self, final):
+        for rank, rule in enumerate(self.rules):
+            if self.found[rank] or self.exhausted[rank]:
+                continue
+            if isinstance(rule, BlockRule):
+                self._scan_block(rank, rule)
+            else:
+                self._scan_urls(rank, rule, final)
+            if final:
+                self.exhausted[rank] = True
+
+        self._trim()
+        for rank in range(len(self.rules)):
+            if self.found[rank]:
+                return self.found[rank]
+            if not self.exhausted[rank]:
+                return None  # A better match may still come
+        return None
+
+    def _scan_urls(self, rank, rule, final):
+        end = self.base + len(self.buffer)
+        match = rule.pattern.search(self.buffer, self.positions[rank] - self.base)
+        # A match running into the end of the buffer may be cut short (e.g. its query)
+        if match and (final or match.end() < len(self.buffer)):
+            raw = match.group(1) if rule.pattern.groups else match.group(0)
+            self.found[rank] = rule.convert(bytes(raw), self.page_url)
+        elif match:
+            self.positions[rank] = self.base + match.start()
+        else:
+            self.positions[rank] = max(self.positions[rank], end - MAX_URL_LENGTH)
+
+    def _scan_block(self, rank, rule):
+        end = self.base + len(self.buffer)
+        if self.block_starts[rank] is None:
+            index = self.buffer.find(rule.start, self.positions[rank] - self.base)
+            if index < 0:
+                self.positions[rank] = max(self.positions[rank], end - len(rule.start) + 1)
+                return
+            self.block_starts[rank] = self.positions[rank] = self.base + index + len(rule.start)
+        index = self.buffer.find(rule.end, self.positions[rank] - self.base)
+        if index < 0:
+            self.positions[rank] = max(self.positions[rank], end - len(rule.end) + 1)
+            return
+        block = bytes(self.buffer[self.block_starts[rank] - self.base:index])
+        self.found[rank] = rule.handler(block, self.page_url)
+        # A page has one such block; nothing more to look for either way
+        self.exhausted[rank] = True
+        self.block_starts[rank] = None
+
+    def _trim(self):
+        # Drop bytes no rule needs any more (an open block keeps everything from its start)
+        needed = [self.block_starts[rank] if self.block_starts[rank] is not None else self.positions[rank]
+                  for rank in range(len(self.rules)) if not (self.found[rank] or self.exhausted[rank])]
+        keep_from = max(0, min(needed, default=self.base + len(self.buffer)) - self.base)
+        if keep_from > SCAN_CHUNK:
+            del self.buffer[:keep_from]
+            self.base += keep_from
+
+
+def extract_media_url(page_url, rules, headers=None, timeout=30):
+    """
+    Streams `page_url` through a MediaUrlExtractor and closes the connection
+    as soon as the URL is known. Returns the URL or None; HTTP errors raise.
+    """
+    extractor = MediaUrlExtractor(rules, page_url)
+    capture = bytearray() if DEBUG_CAPTURE_DIR else None
+    found = None
+    read = 0
+    metrics = get_metrics()
+    host = urlsplit(page_url).hostname or ""
+    started = time.perf_counter()
+    with get_session(page_url).get(page_url, headers=headers, stream=True, timeout=timeout) as response:
+        ttfb = time.perf_counter() - started
+        metrics.response(host, "page", response.status_code)
+        response.raise_for_status()
+        for chunk in response.iter_content(chunk_size=SCAN_CHUNK):
+            read += len(chunk)
+            if capture is not None:
+                capture += chunk
+            found = extractor.feed(chunk)
+            if found:
+                break
+        else:
+            found = extractor.finish()
+    # Leaving the block early closes the connection instead of reading the rest
+    metrics.request_done(host, "page", ttfb, time.perf_counter() - started - ttfb, read)
+    print(f"[DEBUG] Scanned {read} bytes of {page_url}: {found or 'no media URL'}")
+
+    if not found and capture is not None:
+        save_debug_capture(page_url, capture)
+    return found
+
+
+def save_debug_capture(page_url, body):
+    try:
+        os.makedirs(DEBUG_CAPTURE_DIR, exist_ok=True)
+        name = f"{urlsplit(page_url).hostname}_{hashlib.sha1(page_url.encode()).hexdigest()[:10]}.html"
+        path = os.path.join(DEBUG_CAPTURE_DIR, name)
+        with open(path, 'wb') as f:
+            f.write(body)
+        print(f"[DEBUG] Saved page to {path}")
+    except OSError as e:
+        print(f"[WARN] Failed to save debug page: {e}")
@@ -0,0 +1,231 @@
+import re
+import threading
+from collections import namedtuple
+from urllib.parse import urljoin
+
+# AES-128 HLS needs pycryptodome; other streams download without it
+try:
+    from Crypto.Cipher import AES
+except ImportError:
+    try:
+        from Cryptodome.Cipher import AES
+    except ImportError:
+        AES = None
+
+ATTRIBUTE = re.compile(r'([A-Z0-9-]+)=("[^"]*"|[^,]*)')
+
+# Encryption of one segment, from the #EXT-X-KEY in effect for it
+SegmentKey = namedtuple("SegmentKey", "uri iv")
+
+# A variant fits the connection when its bitrate is at most this share of the
+# measured download speed
+FIT_HEADROOM = 0.8
+
+
+class Variant(namedtuple("Variant", "url bandwidth width height")):
+    """One rendition of a master playlist; bandwidth in bits/s, 0 if not given."""
+    __slots__ = ()
+
+    def label(self):
+        parts = [f"{self.height}p"] if self.height else []
+        if self.bandwidth:
+            parts.append(f"{self.bandwidth / 1e6:.1f} Mbps")
+        return " ".join(parts) or "default"
+
+
+def parse_attributes(line):
+    """Attribute list of a tag line (KEY=value,KEY="quoted") as a dict."""
+    return {name: value.strip('"') for name, value in ATTRIBUTE.findall(line.partition(':')[2])}
+
+
+def parse_master_playlist(text, playlist_url):
+    """Variants of a master playlist, highest bandwidth first."""
+    variants = []
+    attributes = None
+    for line in text.splitlines():
+        line = line.strip()
+        if line.startswith('#EXT-X-STREAM-INF:'):
+            attributes = parse_attributes(line)
+        elif attributes is not None and line and not line.startswith('#'):
+            width, _, height = attributes.get('RESOLUTION', '').lower().partition('x')
+            variants.append(Variant(urljoin(playlist_url, line), _int(attributes.get('BANDWIDTH')),
+                                    _int(width), _int(height)))
+            attributes = None
+    variants.sort(key=lambda v: (v.bandwidth, v.height), reverse=True)
+    return variants
+
+
+def _int(text):
+    try:
+        return int(text)
+    except (TypeError, ValueError):
+        return 0
+
+
+def parse_media_playlist(text, playlist_url):
+    """
+    Returns (segment_urls, keys) for a media playlist, where keys[i] is the
+    SegmentKey of segment i or None if it is not encrypted.
+    Raises for encryption methods other than AES-128.
+    """
+    segments = []
+    keys = []
+    key = None
+    sequence = 0
+    for line in text.splitlines():
+        line = line.strip()
+        if line.startswith('#EXT-X-MEDIA-SEQUENCE:'):
+            sequence = int(line.partition(':')[2] or 0)
+        elif line.startswith('#EXT-X-KEY:'):
+            attributes = parse_attributes(line)
+            method = attributes.get('METHOD', 'NONE')
+            if method == 'NONE':
+                key = None
+            elif method == 'AES-128':
+                iv = attributes.get('IV', '')
+                if iv[:2].lower() == '0x':
+                    iv = iv[2:]
+                key = (urljoin(playlist_url, attributes['URI']), bytes.fromhex(iv.rjust(32, '0')) if iv else None)
+            else:
+                raise Exception(f"Unsupported HLS encryption: {method}")
+        elif line and not line.startswith('#'):
+            segments.append(urljoin(playlist_url, line))
+            if key:
+                # Without an IV attribute the IV is the segment's media sequence number
+                keys.append(SegmentKey(key[0], key[1] or (sequence + len(segments) - 1).to_bytes(16, 'big')))
+            else:
+                keys.append(None)
+    return segments, keys
+
+
+class VariantPolicy:
+    """
+    How a download picks among the variants of a master playlist: the best one,
+    optionally no taller than `max_height`. With `adaptive`, it starts with the
+    best variant that fits the speed last measured for the host and steps down
+    at segment boundaries while the download is slower than the variant's
+    bitrate. One policy is shared by all downloads so speeds carry over.
+    """
+
+    def __init__(self, max_height=0, adaptive=False):
+        self.max_height = max_height
+        self.adaptive = adaptive
+        self.speeds = {}  # host: last measured bytes per second
+        self.lock = threading.Lock()
+
+    def set_quality(self, max_height, adaptive):
+        """Applies to downloads started from now on; measured speeds are kept."""
+        self.max_height = max_height
+        self.adaptive = adaptive
+
+    def __str__(self):
+        if not self.max_height:
+            return "Auto" if self.adaptive else "Best"
+        return f"Auto {self.max_height}p" if self.adaptive else f"{self.max_height}p"
+
+    def allowed(self, variants):
+        # Without a resolution in the playlist a variant is never filtered out
+        capped = [v for v in variants if not (self.max_height and v.height > self.max_height)]
+        return capped or variants[-1:]
+
+    def choose(self, variants, host=None):
+        """Picks the starting variant from a list sorted best first."""
+        variants = self.allowed(variants)
+        speed = self.speed(host) if self.adaptive else None
+        return self.fitting(variants, speed) if speed else variants[0]
+
+    def step_down(self, variants, current, speed):
+        """The variant to switch to at `speed` (bytes/s), or None to stay on `current`."""
+        if not self.adaptive or self.fits(current, speed):
+            return None
+        lower = [v for v in self.allowed(variants) if v.bandwidth < current.bandwidth]
+        return self.fitting(lower, speed) if lower else None
+
+    @staticmethod
+    def fits(variant, speed):
+        return variant.bandwidth <= speed * 8 * FIT_HEADROOM
+
+    def fitting(self, variants, speed):
+        return next((v for v in variants if self.fits(v, speed)), variants[-1])
+
+    def record_speed(self, host, speed):
+        with self.lock:
+            self.speeds[host] = speed
+
+    def speed(self, host):
+        with self.lock:
+            return self.speeds.get(host)
+
+
+def parse_quality(text):
+    """
+    Parses a quality setting such as "Best", "720p", "Auto" or "Auto 720p" into
+    (max_height, adaptive) for a VariantPolicy; 0 means no resolution cap.
+    Raises ValueError for anything else.
+    """
+    words = (text or "").strip().lower().replace(",", " ").split()
+    adaptive = "auto" in words
+    rest = [w for w in words if w not in ("auto", "best", "max")]
+    if len(rest) > 1 or (rest and not re.fullmatch(r'\d+p?', rest[0])):
+        raise ValueError(f"Invalid quality: {text}")
+    return (int(rest[0].rstrip('p')) if rest else 0), adaptive
+
+
+class KeyStore:
+    """
+    AES keys of one playlist, each fetched once however many segments and
+    workers use it. fetch(url) returns the key bytes.
+    """
+
+    def __init__(self, fetch):
+        self.fetch = fetch
+        self.keys = {}  # URI: key bytes
+        self.lock = threading.Lock()
+
+    def get(self, uri):
+        key = self.keys.get(uri)
+        if key is None:
+            with self.lock:
+                key = self.keys.get(uri)
+                if key is None:
+                    key = self.fetch(uri)
+                    if len(key) != 16:
+                        raise Exception(f"Invalid AES-128 key ({len(key)} bytes) from {uri}")
+                    self.keys[uri] = key
+        return key
+
+    def decryptor(self, segment_key):
+        if AES is None:
+            raise Exception("Encrypted stream: install pycryptodome to download it")
+        return SegmentDecryptor(self.get(segment_key.uri), segment_key.iv)
+
+
+class SegmentDecryptor:
+    """
+    AES-128-CBC decryption of a segment as it streams in, in place in the
+    caller's buffer. The last block is always held back because it may carry
+    the PKCS#7 padding; finish() decrypts and unpads it.
+    """
+
+    def __init__(self, key, iv):
+        self.cipher = AES.new(key, AES.MODE_CBC, iv)
+
+    def decrypt(self, view, length):
+        """
+        Decrypts view[:ready] in place and returns `ready`: every complete block
+        of view[:length] but the last. The caller must pass the remaining
+        bytes again at the start of the next call (or to finish()).
+        """
+        ready = max(0, (length - 1) // 16 * 16)
+        if ready:
+            self.cipher.decrypt(view[:ready], output=view[:ready])
+        return ready
+
+    def finish(self, tail):
+        if not len(tail):
+            return b""
+        if len(tail) % 16:
+            raise Exception("Encrypted segment is not a whole number of AES blocks")
+        block = self.cipher.decrypt(bytes(tail))
+        padding = block[-1]
+        return block[:-padding] if 1 <= padding <= 16 else block
@@ -0,0 +1,118 @@
+import json
+import os
+import sqlite3
+
+DB_FILE = os.path.join("config", "jobs.db")
+
+# Job states; the status column is free display text, this is what logic relies on
+JOB_NEW = "new"  # Scraped, not requested yet
+JOB_QUEUED = "queued"  # Waiting for a download slot
+JOB_ACTIVE = "active"  # Downloading
+JOB_PAUSED = "paused"
+JOB_COMPLETED = "completed"
+JOB_CANCELLED = "cancelled"  # Stopped by the user, partial data discarded
+JOB_ERROR = "error"
+
+JOB_STATES = (JOB_NEW, JOB_QUEUED, JOB_ACTIVE, JOB_PAUSED, JOB_COMPLETED, JOB_CANCELLED, JOB_ERROR)
+
+# Final status reported by a download -> job state
+FINISHED_STATES = {"Completed": JOB_COMPLETED, "Paused": JOB_PAUSED, "Cancelled": JOB_CANCELLED}
+
+# Jobs in these states were interrupted if found on startup and are resumed
+UNFINISHED_STATES = (JOB_QUEUED, JOB_ACTIVE)
+
+# Jobs "Resume" picks up; completed ones are only downloaded again on request
+RESUMABLE_STATES = (JOB_NEW, JOB_PAUSED, JOB_ERROR)
+
+# Columns saved per job; "extra" is stored as JSON
+DB_COLUMNS = ("id", "title", "url", "status", "state", "type", "platform", "size", "extra")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY,
+    title TEXT,
+    url TEXT NOT NULL UNIQUE,
+    status TEXT,
+    state TEXT NOT NULL DEFAULT 'new',
+    type TEXT,
+    platform TEXT,
+    size TEXT,
+    extra TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state);
+"""
+
+
+class JobDatabase:
+    """
+    Durable download queue in SQLite (WAL mode). Jobs are keyed by a stable ID.
+
+    Writes are batched: save() and delete() only record the change, flush()
+    commits everything pending in one transaction. Call flush() periodically
+    (e.g. from a timer) and before exit; a crash loses at most the changes
+    since the last flush.
+    """
+
+    def __init__(self, path=DB_FILE):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        # With WAL, NORMAL only risks the last transactions on power loss, never corruption
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self.pending = {}  # id: row tuple to upsert
+        self.deleted = set()
+
+    def load(self):
+        """Returns every job as a dict, in ID order."""
+        self.flush()
+        jobs = []
+        for values in self.conn.execute(f"SELECT {', '.join(DB_COLUMNS)} FROM jobs ORDER BY id"):
+            job = dict(zip(DB_COLUMNS, values))
+            if job["extra"]:
+                job["extra"] = json.loads(job["extra"])
+            jobs.append(job)
+        return jobs
+
+    def ids_in_state(self, *states):
+        """IDs of the jobs in any of the given states (uses the state index)."""
+        self.flush()
+        marks = ", ".join("?" * len(states))
+        return [row[0] for row in self.conn.execute(
+            f"SELECT id FROM jobs WHERE state IN ({marks}) ORDER BY id", states)]
+
+    def save(self, jobs):
+        """Queues inserts/updates for job dicts holding at least "id" and "url"."""
+        for job in jobs:
+            extra = job.get("extra")
+            self.pending[job["id"]] = tuple(
+                json.dumps(extra) if column == "extra" and extra else job.get(column)
+                for column in DB_COLUMNS)
+            self.deleted.discard(job["id"])
+
+    def delete(self, job_ids):
+        for job_id in job_ids:
+            self.pending.pop(job_id, None)
+            self.deleted.add(job_id)
+
+    def flush(self):
+        if not (self.pending or self.deleted) or self.conn is None:
+            return
+        updates = ", ".join(f"{column} = excluded.{column}" for column in DB_COLUMNS[1:])
+        with self.conn:
+            if self.deleted:
+                self.conn.executemany("DELETE FROM jobs WHERE id = ?", [(job_id,) for job_id in self.deleted])
+            if self.pending:
+                self.conn.executemany(
+                    f"INSERT INTO jobs ({', '.join(DB_COLUMNS)}) VALUES ({', '.join('?' * len(DB_COLUMNS))}) "
+                    f"ON CONFLICT(id) DO UPDATE SET {updates}",
+                    list(self.pending.values()))
+        self.pending.clear()
+        self.deleted.clear()
+
+    def close(self):
+        if self.conn is not None:
+            self.flush()
+            self.conn.close()
+            self.conn = None
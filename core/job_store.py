@@ -0,0 +1,102 @@
+from array import array
+
+
+class ColumnStore:
+    """
+    Compact row storage for large tables: one list per column instead of one
+    object per cell, a stable integer ID per row, and a hash index on a key
+    column (e.g. the URL) so duplicate checks and lookups are O(1).
+    Rows move when others are removed; IDs never change.
+    """
+
+    __slots__ = ("columns", "key", "ids", "data", "index", "rows", "next_id")
+
+    def __init__(self, columns, key, first_id=1):
+        self.columns = tuple(columns)
+        self.key = key
+        self.ids = array('q')
+        self.data = {column: [] for column in self.columns}
+        self.index = {}  # key value: row
+        self.rows = {}  # ID: row
+        self.next_id = first_id
+
+    def __len__(self):
+        return len(self.ids)
+
+    def add(self, values):
+        """
+        Appends a row from a dict of column values. An "id" value is kept (e.g.
+        when reloading saved jobs), otherwise a new one is assigned.
+        Returns the row, or None if the key exists.
+        """
+        key_value = values.get(self.key)
+        if key_value in self.index:
+            return None
+        row = len(self.ids)
+        row_id = values.get("id") or self.next_id
+        self.next_id = max(self.next_id, row_id + 1)
+        self.ids.append(row_id)
+        for column in self.columns:
+            self.data[column].append(values.get(column))
+        self.index[key_value] = row
+        self.rows[row_id] = row
+        return row
+
+    def add_many(self, rows):
+        """Appends several rows, skipping duplicates. Returns the rows that were added."""
+        added = []
+        for values in rows:
+            row = self.add(values)
+            if row is not None:
+                added.append(row)
+        return added
+
+    def get(self, row, column):
+        if column == "id":
+            return self.ids[row]
+        return self.data[column][row]
+
+    def set(self, row, column, value):
+        if column == self.key:
+            del self.index[self.data[column][row]]
+            self.index[value] = row
+        self.data[column][row] = value
+
+    def row_dict(self, row):
+        values = {column: self.data[column][row] for column in self.columns}
+        values["id"] = self.ids[row]
+        return values
+
+    def find(self, key_value):
+        """Returns the row holding `key_value` in the key column, or None."""
+        return self.index.get(key_value)
+
+    def row_of(self, row_id):
+        """Returns the current row of an ID, or None if it was removed."""
+        return self.rows.get(row_id)
+
+    def remove_rows(self, rows):
+        """Deletes the given rows in one pass; later rows move up."""
+        drop = set(rows)
+        if not drop:
+            return
+        keep = [row for row in range(len(self.ids)) if row not in drop]
+        self.ids = array('q', (self.ids[row] for row in keep))
+        for column in self.columns:
+            values = self.data[column]
+            self.data[column] = [values[row] for row in keep]
+        keys = self.data[self.key]
+        self.index = {keys[row]: row for row in range(len(keys))}
+        self.rows = {row_id: row for row, row_id in enumerate(self.ids)}
+
+
+# Activity table columns, in display order after the ID
+JOB_COLUMNS = ("title", "url", "status", "type", "platform", "size", "speed", "eta", "state", "extra")
+
+
+def create_job_store():
+    """
+    Store for the activity table. 'state' is one of the JOB_* states in
+    core.job_db; 'extra' holds any other scraped fields (e.g. stream_url).
+    """
+    return ColumnStore(JOB_COLUMNS, key="url", first_id=1001)
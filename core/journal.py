@@ -0,0 +1,199 @@
+import json
+import os
+
+
+def _strip_query(url):
+    # Signed CDN tokens change on every resolve, the segment paths do not
+    return url.split('?', 1)[0]
+
+
+class SegmentJournal:
+    """
+    Append-only record of the HLS segments already written to a temp file.
+    The first line holds the playlist and its segment list, every following
+    line is one completed segment: [index, byte offset, length].
+    """
+
+    def __init__(self, temp_file):
+        self.temp_file = temp_file
+        self.path = temp_file + ".journal"
+        self._fh = None
+
+    def started_from(self, playlist_urls):
+        """Returns whichever of `playlist_urls` the temp file was started from, or None."""
+        if not (os.path.exists(self.path) and os.path.exists(self.temp_file)):
+            return None
+        loaded = self._load()
+        recorded = loaded[0].get("playlist") if loaded else None
+        return next((url for url in playlist_urls if _strip_query(url) == recorded), None)
+
+    def resume(self, playlist_url, segments):
+        """
+        Opens the journal for writing and returns (completed, offset): the number
+        of leading segments already in the temp file and the byte offset where
+        the next one starts. A journal for a different playlist starts from zero.
+        """
+        header = self._header(playlist_url, segments)
+        done = {}
+        if os.path.exists(self.path) and os.path.exists(self.temp_file):
+            loaded = self._load()
+            if loaded and loaded[0] == header:
+                done = loaded[1]
+
+        # Only an unbroken run of segments from the start is usable, and only
+        # as far as the bytes actually made it to disk.
+        size = os.path.getsize(self.temp_file) if done else 0
+        entries = []
+        offset = 0
+        while len(entries) in done:
+            seg_offset, length = done[len(entries)]
+            if seg_offset != offset or offset + length > size:
+                break
+            entries.append([len(entries), seg_offset, length])
+            offset += length
+
+        self._rewrite(header, entries)
+        return len(entries), offset
+
+    def switch(self, playlist_url, segments, completed):
+        """
+        Continues the temp file from another variant of the same stream: the
+        first `completed` segments stay, the rest will come from `segments`.
+        """
+        loaded = self._load()
+        done = loaded[1] if loaded else {}
+        self._rewrite(self._header(playlist_url, segments),
+                      [[index, *done[index]] for index in range(completed) if index in done])
+
+    def record(self, index, offset, length):
+        """Marks a segment as written. The data must be flushed before calling."""
+        self._fh.write(json.dumps([index, offset, length]) + "\n")
+        self._fh.flush()
+
+    @staticmethod
+    def _header(playlist_url, segments):
+        return {
+            "playlist": _strip_query(playlist_url),
+            "segments": [_strip_query(s) for s in segments],
+        }
+
+    def _rewrite(self, header, entries):
+        # Replaced in one step, so a crash leaves either the old or the new journal
+        self.close()
+        with open(self.path + ".tmp", 'w', encoding='utf-8') as f:
+            f.write(json.dumps(header) + "\n")
+            for entry in entries:
+                f.write(json.dumps(entry) + "\n")
+        os.replace(self.path + ".tmp", self.path)
+        self._fh = open(self.path, 'a', encoding='utf-8')
+
+    def close(self):
+        if self._fh:
+            self._fh.close()
+            self._fh = None
+
+    def discard(self):
+        """Closes and deletes the journal, e.g. once the download is complete."""
+        self.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def _load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                header = json.loads(f.readline())
+                done = {}
+                for line in f:
+                    try:
+                        index, offset, length = json.loads(line)
+                    except ValueError:
+                        break  # Torn last line from a crash
+                    done[index] = (offset, length)
+            return header, done
+        except Exception as e:
+            print(f"[WARN] Ignoring unreadable journal {self.path}: {e}")
+            return None
+
+
+class PartialDownload:
+    """
+    A direct file download in progress: the data lives in <file>.part and the
+    byte ranges still to fetch in <file>.part.json, together with the server
+    validators (ETag/Last-Modified/size) the data was fetched against.
+    Each range is a [start, end, position] list, `end` inclusive.
+    """
+
+    def __init__(self, filepath):
+        self.filepath = filepath
+        self.path = filepath + ".part"
+        self.meta_path = self.path + ".json"
+        self.url = None
+        self.validators = None
+        self.ranges = None
+
+    @staticmethod
+    def has_validator(validators):
+        return bool(validators.get("etag") or validators.get("last_modified"))
+
+    def resume(self, url, validators):
+        """
+        Returns the saved ranges if the .part file belongs to the same resource,
+        unchanged on the server since it was written, otherwise None.
+        """
+        if not self.has_validator(validators):
+            return None
+        if not (os.path.exists(self.meta_path) and os.path.exists(self.path)):
+            return None
+        try:
+            with open(self.meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+        except Exception as e:
+            print(f"[WARN] Ignoring unreadable {self.meta_path}: {e}")
+            return None
+
+        if meta.get("url") != _strip_query(url) or meta.get("validators") != validators:
+            print(f"[DEBUG] {self.path} is stale, starting over")
+            return None
+        if os.path.getsize(self.path) != validators.get("size"):
+            return None
+
+        self.url = meta["url"]
+        self.validators = validators
+        self.ranges = meta["ranges"]
+        return self.ranges
+
+    def start(self, url, validators, ranges):
+        """Creates a fresh, preallocated .part file for the given ranges."""
+        self.discard()
+        self.url = _strip_query(url)
+        self.validators = validators
+        self.ranges = [[start, end, start] for start, end in ranges]
+        with open(self.path, 'wb') as f:
+            if validators.get("size"):
+                f.truncate(validators["size"])
+        self.save()
+        return self.ranges
+
+    def downloaded(self):
+        return sum(position - start for start, end, position in self.ranges or [])
+
+    def save(self):
+        """Persists range positions. Only positions whose bytes were written may be saved."""
+        if self.ranges is None or not self.has_validator(self.validators):
+            return
+        tmp_path = self.meta_path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"url": self.url, "validators": self.validators, "ranges": self.ranges}, f)
+        os.replace(tmp_path, self.meta_path)
+
+    def complete(self):
+        """Moves the finished .part file into place."""
+        os.replace(self.path, self.filepath)
+        if os.path.exists(self.meta_path):
+            os.remove(self.meta_path)
+
+    def discard(self):
+        self.ranges = None
+        for path in (self.path, self.meta_path):
+            if os.path.exists(path):
+                os.remove(path)
@@ -1,18 +1,112 @@
-from platforms.netshort import NetShortPlatform
-from platforms.dramabox import DramaboxPlatform
+import threading
+from importlib import import_module
+from importlib.metadata import entry_points
+from urllib.parse import urlsplit
+
+# Entry point group other packages use to add platforms. The entry point name
+# is the host it serves (subdomains included), e.g. in pyproject.toml:
+#   [project.entry-points."sdm.platforms"]
+#   "example.com" = "sdm_example.platform:ExamplePlatform"
+ENTRY_POINT_GROUP = "sdm.platforms"
+
+# Built-in platforms: host -> "module:Class"
+BUILTIN_PLATFORMS = {
+    "netshort.com": "platforms.netshort:NetShortPlatform",
+    "dramaboxdb.com": "platforms.dramabox:DramaboxPlatform",
+}
+
+
+def url_host(url):
+    """Lower-case hostname of a URL; URLs pasted without a scheme are accepted too."""
+    url = url.strip()
+    if "://" not in url:
+        url = "//" + url
+    try:
+        return (urlsplit(url).hostname or "").rstrip(".")
+    except ValueError:
+        return ""
+
 
 class PlatformManager:
-    def __init__(self):
-        self.platforms = []
-        self.register_platforms()
+    """
+    Routes URLs to platforms through a hostname index. A URL is matched on its
+    host and then each parent domain (www.netshort.com -> netshort.com), so a
+    lookup costs a few dict probes however many platforms are registered.
 
-    def register_platforms(self):
-        # Register all available platforms here
-        self.platforms.append(NetShortPlatform())
-        self.platforms.append(DramaboxPlatform())
+    Platform modules are only imported, and their classes instantiated, the
+    first time a URL for them is looked up. Use get_platform_manager() for the
+    shared instance.
+    """
 
-    def get_platform_for_url(self, url):
-        for platform in self.platforms:
-            if platform.can_handle(url):
-                return platform
+    def __init__(self, discover=True):
+        self.lock = threading.Lock()
+        self.hosts = {}  # host: "module:Class" or a BasePlatform subclass
+        self.instances = {}  # host: platform instance
+        for host, target in BUILTIN_PLATFORMS.items():
+            self.register(host, target)
+        if discover:
+            self.discover_plugins()
+
+    def register(self, host, target):
+        """Maps a host (and its subdomains) to a platform class or a "module:Class" path."""
+        with self.lock:
+            self.hosts[host.lower()] = target
+            self.instances.pop(host.lower(), None)
+
+    def discover_plugins(self):
+        # Only reads package metadata; the plugin module is imported on first use
+        try:
+            plugins = entry_points(group=ENTRY_POINT_GROUP)
+        except Exception as e:
+            print(f"[WARN] Platform plugin discovery failed: {e}")
+            return
+        for entry in plugins:
+            self.register(entry.name, entry.value)
+
+    def match_host(self, url):
+        """Returns the registered host serving `url`, or None. Imports nothing."""
+        host = url_host(url)
+        while host:
+            if host in self.hosts:
+                return host
+            host = host.partition(".")[2]
         return None
+
+    def handles(self, url):
+        return self.match_host(url) is not None
+
+    def get_platform_for_url(self, url):
+        host = self.match_host(url)
+        if host is None:
+            return None
+        platform = self.instances.get(host)
+        if platform is None:
+            with self.lock:
+                platform = self.instances.get(host)
+                if platform is None:
+                    try:
+                        platform = self._load(self.hosts[host])
+                    except Exception as e:
+                        print(f"[ERROR] Failed to load platform for {host}: {e}")
+                        return None
+                    self.instances[host] = platform
+        return platform
+
+    @staticmethod
+    def _load(target):
+        if isinstance(target, str):
+            module_name, _, class_name = target.partition(":")
+            target = getattr(import_module(module_name), class_name)
+        return target()
+
+
+_manager = None
+_manager_lock = threading.Lock()
+
+
+def get_platform_manager():
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = PlatformManager()
+        return _manager
@@ -0,0 +1,171 @@
+import bisect
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Set to a port to serve the metrics at http://127.0.0.1:<port>/metrics
+METRICS_PORT = os.environ.get("SDM_METRICS_PORT")
+
+# Histogram buckets, in seconds
+REQUEST_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+DOWNLOAD_BUCKETS = (1, 5, 15, 30, 60, 120, 300, 600, 1800, 3600)
+
+# name: (type, help, buckets)
+METRICS = {
+    "sdm_resolve_seconds": ("histogram", "Time to turn an episode page into a media URL.", REQUEST_BUCKETS),
+    "sdm_resolves_total": ("counter", "Media URLs resolved, by where they came from (cache, scraped, page).", None),
+    "sdm_playlist_seconds": ("histogram", "HLS playlist fetch time.", REQUEST_BUCKETS),
+    "sdm_ttfb_seconds": ("histogram", "Request sent to response headers received.", REQUEST_BUCKETS),
+    "sdm_transfer_seconds": ("histogram", "Response headers to last body byte.", REQUEST_BUCKETS),
+    "sdm_bytes_total": ("counter", "Response body bytes received.", None),
+    "sdm_responses_total": ("counter", "HTTP responses by status class (2xx, 403, 4xx, 5xx).", None),
+    "sdm_retries_total": ("counter", "Requests retried after a failed attempt.", None),
+    "sdm_request_failures_total": ("counter", "Requests that failed on every attempt.", None),
+    "sdm_downloads_total": ("counter", "Downloads ended, by final status.", None),
+    "sdm_download_seconds": ("histogram", "Wall time of downloads that ran to completion.", DOWNLOAD_BUCKETS),
+    "sdm_download_bytes": ("gauge", "Bytes written so far by each running download.", None),
+    "sdm_download_elapsed_seconds": ("gauge", "Time since each running download started.", None),
+}
+
+
+def status_class(status_code):
+    if status_code == 403:
+        return "403"
+    return f"{status_code // 100}xx"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels, extra=""):
+    parts = [f'{name}="{_escape(value)}"' for name, value in labels]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class MetricsRegistry:
+    """
+    In-process counters and histograms labelled by host, platform, request
+    kind etc., cheap enough to update per segment. Running downloads are read
+    from their tasks at render time instead of being pushed on every chunk.
+    render() returns the Prometheus text format; use get_metrics() for the
+    shared instance.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = {}  # (name, labels): value
+        self.histograms = {}  # (name, labels): [bucket counts..., +Inf count, sum]
+        self.downloads = {}  # job ID: DownloadTask
+
+    @staticmethod
+    def _key(name, labels):
+        return name, tuple(sorted(labels.items()))
+
+    def inc(self, name, amount=1, **labels):
+        key = self._key(name, labels)
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def observe(self, name, value, **labels):
+        key = self._key(name, labels)
+        buckets = METRICS[name][2]
+        with self.lock:
+            counts = self.histograms.get(key)
+            if counts is None:
+                counts = self.histograms[key] = [0] * (len(buckets) + 2)
+            counts[bisect.bisect_left(buckets, value)] += 1
+            counts[-1] += value
+
+    # --- Helpers for the download engine ---
+
+    def response(self, host, kind, status_code):
+        self.inc("sdm_responses_total", host=host, kind=kind, status=status_class(status_code))
+
+    def request_done(self, host, kind, ttfb, transfer, size):
+        self.observe("sdm_ttfb_seconds", ttfb, host=host, kind=kind)
+        self.observe("sdm_transfer_seconds", transfer, host=host, kind=kind)
+        self.inc("sdm_bytes_total", size, host=host, kind=kind)
+
+    def download_started(self, task):
+        with self.lock:
+            self.downloads[task.job_id] = task
+
+    def download_ended(self, task, status):
+        with self.lock:
+            self.downloads.pop(task.job_id, None)
+        platform = task.video_data.get('platform') or "Unknown"
+        self.inc("sdm_downloads_total", platform=platform, status=status)
+        if status == "Completed" and task.started:
+            self.observe("sdm_download_seconds", time.monotonic() - task.started, platform=platform)
+
+    # --- Exposition ---
+
+    def render(self):
+        with self.lock:
+            counters = dict(self.counters)
+            histograms = {key: list(counts) for key, counts in self.histograms.items()}
+            downloads = list(self.downloads.values())
+
+        now = time.monotonic()
+        samples = {}  # name: [line, ...]
+        for (name, labels), value in sorted(counters.items()):
+            samples.setdefault(name, []).append(f"{name}{_format_labels(labels)} {value}")
+        for (name, labels), counts in sorted(histograms.items()):
+            lines = samples.setdefault(name, [])
+            cumulative = 0
+            for bound, count in zip(METRICS[name][2] + ("+Inf",), counts):
+                cumulative += count
+                le = f'le="{bound}"'
+                lines.append(f"{name}_bucket{_format_labels(labels, le)} {cumulative}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {counts[-1]}")
+            lines.append(f"{name}_count{_format_labels(labels)} {cumulative}")
+        for task in downloads:
+            labels = (("job", task.job_id), ("platform", task.video_data.get('platform') or "Unknown"))
+            samples.setdefault("sdm_download_bytes", []).append(
+                f"sdm_download_bytes{_format_labels(labels)} {task.bytes_done}")
+            samples.setdefault("sdm_download_elapsed_seconds", []).append(
+                f"sdm_download_elapsed_seconds{_format_labels(labels)} {now - task.started:.3f}")
+
+        out = []
+        for name, lines in samples.items():
+            kind, help_text, _ = METRICS[name]
+            out.append(f"# HELP {name} {help_text}")
+            out.append(f"# TYPE {name} {kind}")
+            out.extend(lines)
+        return "\n".join(out) + "\n"
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?', 1)[0] not in ("/", "/metrics"):
+            self.send_error(404)
+            return
+        body = get_metrics().render().encode('utf-8')
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_metrics_server(port, host="127.0.0.1"):
+    """Serves get_metrics() as Prometheus text on a daemon thread. Returns the server."""
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="MetricsServer", daemon=True).start()
+    print(f"Serving metrics at http://{host}:{server.server_address[1]}/metrics")
+    return server
+
+
+_metrics = MetricsRegistry()
+
+
+def get_metrics():
+    return _metrics
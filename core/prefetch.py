@@ -0,0 +1,78 @@
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from core.resolve_cache import EXPIRY_MARGIN
+
+# Background threads resolving pages and fetching playlists for queued downloads
+PREFETCH_WORKERS = 2
+
+# What a download needs before its first segment: the media URL, the playlist
+# texts by URL, and the Unix time the earliest token among them expires
+Prefetched = namedtuple("Prefetched", "media_url playlists expires")
+
+
+def expired(prefetched):
+    return prefetched.expires - EXPIRY_MARGIN <= time.time()
+
+
+class Prefetcher:
+    """
+    Prepares queued downloads ahead of their turn, so a download slot starts
+    fetching segments right away instead of spending several round-trips on
+    the episode page and playlists.
+
+    submit(key, prepare) runs prepare() -> Prefetched on a background thread;
+    take(key) hands the Future to the download as it starts. The download
+    waits for it on its own thread and ignores it if it failed or its tokens
+    are about to expire (see usable()).
+    """
+
+    def __init__(self, workers=PREFETCH_WORKERS):
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="Prefetch")
+        self.futures = {}  # key: Future
+        self.lock = threading.Lock()
+
+    def submit(self, key, prepare):
+        """Starts preparing a job unless it already is (or was)."""
+        with self.lock:
+            future = self.futures.get(key)
+            if future is not None and not self._stale(future):
+                return
+            self.futures[key] = self.pool.submit(prepare)
+
+    def take(self, key):
+        """The job's Future, or None if it was never submitted. A Future not yet running is cancelled."""
+        with self.lock:
+            future = self.futures.pop(key, None)
+        if future is None or future.cancel():
+            return None
+        return future
+
+    def discard(self, key):
+        with self.lock:
+            future = self.futures.pop(key, None)
+        if future:
+            future.cancel()
+
+    def shutdown(self):
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+    @staticmethod
+    def usable(future):
+        """Waits for a prefetch and returns its Prefetched, or None if it failed or is about to expire."""
+        try:
+            prefetched = future.result()
+        except Exception as e:
+            print(f"[WARN] Prefetch failed: {e}")
+            return None
+        if not prefetched or expired(prefetched):
+            return None
+        return prefetched
+
+    @staticmethod
+    def _stale(future):
+        # A prefetch whose tokens ran out while the job waited is done again;
+        # a failed one is not retried until the download itself runs
+        return (future.done() and not future.cancelled() and future.exception() is None
+                and future.result() is not None and expired(future.result()))
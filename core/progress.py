@@ -0,0 +1,75 @@
+import threading
+import time
+
+# Weight of the newest sample in the smoothed speed
+SPEED_SMOOTHING = 0.3
+
+
+class ProgressBoard:
+    """
+    Shared progress counters. Workers call update() as often as they like (it
+    only stores numbers under a lock); a single consumer, e.g. a UI timer,
+    calls drain() at a fixed rate and gets one entry per job that changed,
+    with a smoothed speed and an ETA.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.jobs = {}  # key: [fraction, bytes_done, total_bytes, speed, sampled_bytes, sampled_at]
+        self.dirty = set()
+
+    def update(self, key, fraction, bytes_done, total_bytes=None):
+        """fraction is 0..1; total_bytes may be None when unknown (e.g. HLS)."""
+        with self.lock:
+            job = self.jobs.get(key)
+            if job is None:
+                job = [0.0, 0, None, 0.0, bytes_done, time.monotonic()]
+                self.jobs[key] = job
+            job[0] = fraction
+            job[1] = bytes_done
+            job[2] = total_bytes
+            self.dirty.add(key)
+
+    def remove(self, key):
+        with self.lock:
+            self.jobs.pop(key, None)
+            self.dirty.discard(key)
+
+    def drain(self):
+        """
+        Returns [(key, percent, bytes_per_second, eta_seconds or None, total_bytes or None)]
+        for every job updated since the last call.
+        """
+        now = time.monotonic()
+        changed = []
+        with self.lock:
+            for key in self.dirty:
+                job = self.jobs[key]
+                fraction, bytes_done, total_bytes, speed, sampled_bytes, sampled_at = job
+                elapsed = now - sampled_at
+                if elapsed > 0:
+                    sample = max(0, bytes_done - sampled_bytes) / elapsed
+                    speed = sample if not speed else speed + SPEED_SMOOTHING * (sample - speed)
+                    job[3], job[4], job[5] = speed, bytes_done, now
+
+                # Estimate the total from the fraction when the size is unknown
+                total = total_bytes or (bytes_done / fraction if fraction > 0 else None)
+                eta = (total - bytes_done) / speed if total and speed > 0 else None
+                changed.append((key, int(fraction * 100), speed, eta, total_bytes))
+            self.dirty.clear()
+        return changed
+
+
+def format_bytes(size):
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024 or unit == "GB":
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+
+
+def format_eta(seconds):
+    if seconds is None:
+        return ""
+    seconds = int(seconds)
+    hours, rest = divmod(seconds, 3600)
+    return f"{hours}:{rest // 60:02d}:{rest % 60:02d}" if hours else f"{rest // 60}:{rest % 60:02d}"
@@ -0,0 +1,111 @@
+import re
+import threading
+import time
+from urllib.parse import urlsplit
+
+# Largest piece of data throttled in one go, so concurrent jobs interleave fairly
+THROTTLE_CHUNK = 64 * 1024
+
+
+class TokenBucket:
+    """
+    Byte-rate token bucket. `rate` is in bytes per second, 0 means unlimited.
+    Callers reserve tokens under the lock in arrival order and sleep outside
+    it, so waiting jobs are served first come, first served.
+    """
+
+    def __init__(self, rate=0, burst=None):
+        self.lock = threading.Lock()
+        self.rate = 0
+        self.burst = 0
+        self.tokens = 0.0
+        self.updated = time.monotonic()
+        self.set_rate(rate, burst)
+
+    def set_rate(self, rate, burst=None):
+        with self.lock:
+            self.rate = max(0, int(rate))
+            # Allow a quarter second of burst by default, but never less than one chunk
+            self.burst = burst if burst is not None else max(self.rate // 4, THROTTLE_CHUNK)
+            self.tokens = min(self.tokens, self.burst)
+            self.updated = time.monotonic()
+
+    def reserve(self, amount):
+        """Takes `amount` tokens, going into debt if needed. Returns the seconds to wait."""
+        with self.lock:
+            if not self.rate:
+                return 0.0
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= amount
+            return -self.tokens / self.rate if self.tokens < 0 else 0.0
+
+
+class RateLimiter:
+    """
+    Global bandwidth limit shared by all downloads, plus an optional limit
+    applied to each host separately. Both can be changed at runtime.
+    """
+
+    def __init__(self, rate=0, host_rate=0):
+        self.bucket = TokenBucket(rate)
+        self.host_rate = host_rate
+        self.host_buckets = {}  # host: TokenBucket
+        self.lock = threading.Lock()
+
+    def set_rate(self, rate):
+        self.bucket.set_rate(rate)
+
+    def set_host_rate(self, rate):
+        with self.lock:
+            self.host_rate = max(0, int(rate))
+            for bucket in self.host_buckets.values():
+                bucket.set_rate(self.host_rate)
+
+    def throttle(self, url, amount):
+        """Blocks until `amount` bytes received from `url` fit within the limits."""
+        if not self.bucket.rate and not self.host_rate:
+            return
+        host = urlsplit(url).hostname or ""
+        while amount > 0:
+            piece = min(amount, THROTTLE_CHUNK)
+            amount -= piece
+            delay = self.bucket.reserve(piece)
+            if self.host_rate:
+                delay = max(delay, self._host_bucket(host).reserve(piece))
+            if delay > 0:
+                time.sleep(delay)
+
+    def _host_bucket(self, host):
+        with self.lock:
+            bucket = self.host_buckets.get(host)
+            if bucket is None:
+                bucket = TokenBucket(self.host_rate)
+                self.host_buckets[host] = bucket
+            return bucket
+
+
+_UNITS = {"": 1024, "B": 1, "K": 1024, "KB": 1024, "M": 1024 ** 2, "MB": 1024 ** 2, "G": 1024 ** 3, "GB": 1024 ** 3}
+
+
+def parse_rate(text):
+    """
+    Parses a speed setting such as "Unlimited", "500", "500 KB/s" or "2MB"
+    into bytes per second (0 = unlimited). Bare numbers are KB/s.
+    Raises ValueError for anything else.
+    """
+    value = (text or "").strip().upper()
+    if value in ("", "0", "UNLIMITED", "OFF", "NONE"):
+        return 0
+    match = re.fullmatch(r'(\d+(?:\.\d+)?)\s*([KMG]?B?)(?:/S|PS)?', value)
+    if not match:
+        raise ValueError(f"Invalid speed limit: {text}")
+    return int(float(match.group(1)) * _UNITS[match.group(2)])
+
+
+_limiter = RateLimiter()
+
+
+def get_rate_limiter():
+    return _limiter
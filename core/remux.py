@@ -0,0 +1,422 @@
+import struct
+
+TS_PACKET_SIZE = 188
+
+# PMT stream types carried into the MP4; metadata streams are dropped
+STREAM_H264 = 0x1B
+STREAM_AAC = 0x0F
+IGNORED_STREAMS = (0x15, 0x86)  # ID3 timed metadata, SCTE-35 cues
+
+VIDEO_TIMESCALE = 90000  # MPEG-TS clock, kept as is
+TIMESTAMP_WRAP = 1 << 33  # PTS/DTS are 33-bit counters
+AAC_FRAME_SAMPLES = 1024
+AAC_SAMPLE_RATES = (96000, 88200, 64000, 48000, 44100, 32000, 24000, 22050, 16000, 12000, 11025, 8000, 7350)
+
+# trun sample flags
+SYNC_SAMPLE = 0x02000000  # depends on no other sample
+NON_SYNC_SAMPLE = 0x01010000  # depends on others, not a sync sample
+
+# 3x3 unity matrix of mvhd/tkhd
+UNITY_MATRIX = struct.pack('>9I', 0x10000, 0, 0, 0, 0x10000, 0, 0, 0, 0x40000000)
+
+
+class RemuxError(Exception):
+    """The transport stream cannot be carried into MP4 without re-encoding."""
+
+
+def box(kind, *payloads):
+    payload = b"".join(payloads)
+    return struct.pack('>I4s', 8 + len(payload), kind) + payload
+
+
+def full_box(kind, version, flags, *payloads):
+    return box(kind, struct.pack('>I', (version << 24) | flags), *payloads)
+
+
+class TsRemuxer:
+    """
+    Turns MPEG-TS segments (H.264 video, AAC audio) into a fragmented MP4,
+    one moof/mdat fragment per segment, copying the coded frames as they are.
+    The ftyp/moov header is produced with the first segment (write_init=False
+    when appending to a file that already has it, e.g. on resume).
+
+    Timestamps keep the stream's own clock, so fragments of a resumed
+    download line up with those written before. Where the 33-bit clock
+    wraps (about every 26.5 hours) they keep counting past it.
+
+    Besides the header, a remuxer carries state from segment to segment: the
+    PAT/PMT stream map, the AAC configuration, the last video frame duration
+    and the last DTS per stream. A resumed download starts a fresh one, which
+    relearns them from the first segment it gets.
+    """
+
+    def __init__(self, write_init=True):
+        self.write_init = write_init
+        self.pmt_pids = set()
+        self.streams = {}  # PID: stream type
+        self.audio_config = None  # Last seen (object type, sample rate index, channels)
+        self.video_duration = VIDEO_TIMESCALE // 25  # Used for the last frame of a fragment
+        self.last_dts = {}  # PID: unwrapped DTS of the last sample seen
+
+    def remux(self, segment, sequence):
+        """Returns the MP4 bytes for one TS segment; raises RemuxError if it cannot be remuxed."""
+        packets = self.demux(segment)
+        unsupported = [kind for kind in self.streams.values()
+                       if kind not in (STREAM_H264, STREAM_AAC) and kind not in IGNORED_STREAMS]
+        if unsupported:
+            raise RemuxError(f"unsupported stream type 0x{unsupported[0]:02x}")
+        video_pid = next((pid for pid, kind in sorted(self.streams.items()) if kind == STREAM_H264), None)
+        audio_pid = next((pid for pid, kind in sorted(self.streams.items()) if kind == STREAM_AAC), None)
+        if video_pid is None and audio_pid is None:
+            raise RemuxError("no H.264 or AAC stream found")
+
+        tracks = []
+        if video_pid is not None:
+            tracks.append(self.video_track(packets.get(video_pid, [])))
+        if audio_pid is not None:
+            tracks.append(self.audio_track(packets.get(audio_pid, [])))
+        for track_id, track in enumerate(tracks, 1):
+            track["id"] = track_id
+
+        out = []
+        if self.write_init:
+            out.append(self.init_segment(tracks))
+            self.write_init = False
+        out.append(self.fragment(tracks, sequence))
+        return b"".join(out)
+
+    # --- MPEG-TS ---
+
+    def demux(self, data):
+        """Returns {PID: [(pts, dts, payload)]} for the elementary streams in the segment."""
+        pes = {}  # PID: list of bytearrays, one per PES packet
+        view = memoryview(data)
+        end = len(data) - TS_PACKET_SIZE + 1
+        for pos in range(0, max(end, 0), TS_PACKET_SIZE):
+            if data[pos] != 0x47:
+                continue
+            pid = ((data[pos + 1] & 0x1F) << 8) | data[pos + 2]
+            unit_start = data[pos + 1] & 0x40
+            adaptation = (data[pos + 3] >> 4) & 3
+            start = pos + 4
+            if adaptation & 2:
+                start += 1 + data[pos + 4]
+            stop = pos + TS_PACKET_SIZE
+            if not adaptation & 1 or start >= stop:
+                continue
+
+            if pid == 0:
+                if unit_start:
+                    self.parse_pat(bytes(view[start:stop]))
+            elif pid in self.pmt_pids:
+                if unit_start:
+                    self.parse_pmt(bytes(view[start:stop]))
+            elif pid in self.streams:
+                if unit_start:
+                    pes.setdefault(pid, []).append(bytearray(view[start:stop]))
+                elif pes.get(pid):
+                    pes[pid][-1] += view[start:stop]
+                # A PES continued from the previous segment has no header; it is dropped
+
+        return {pid: self.unwrap_timestamps(pid, [parsed for parsed in map(self.parse_pes, packets) if parsed])
+                for pid, packets in pes.items()}
+
+    def unwrap_timestamps(self, pid, packets):
+        """Continues DTS past the clock wrap against the PID's previous sample, and PTS against its DTS."""
+        last = self.last_dts.get(pid)
+        unwrapped = []
+        for pts, dts, payload in packets:
+            if dts is not None:
+                dts = unwrap_timestamp(dts, last)
+                pts = unwrap_timestamp(pts, dts)
+                last = dts
+            unwrapped.append((pts, dts, payload))
+        if last is not None:
+            self.last_dts[pid] = last
+        return unwrapped
+
+    def parse_pat(self, payload):
+        section = payload[1 + payload[0]:]
+        length = ((section[1] & 0x0F) << 8) | section[2]
+        for pos in range(8, 3 + length - 4, 4):
+            program = (section[pos] << 8) | section[pos + 1]
+            if program:
+                self.pmt_pids.add(((section[pos + 2] & 0x1F) << 8) | section[pos + 3])
+
+    def parse_pmt(self, payload):
+        section = payload[1 + payload[0]:]
+        length = ((section[1] & 0x0F) << 8) | section[2]
+        pos = 12 + (((section[10] & 0x0F) << 8) | section[11])
+        end = min(3 + length - 4, len(section))
+        while pos + 5 <= end:
+            pid = ((section[pos + 1] & 0x1F) << 8) | section[pos + 2]
+            self.streams[pid] = section[pos]
+            pos += 5 + (((section[pos + 3] & 0x0F) << 8) | section[pos + 4])
+
+    @staticmethod
+    def parse_pes(packet):
+        if len(packet) < 9 or packet[:3] != b"\x00\x00\x01":
+            return None
+        flags = packet[7]
+        pts = dts = None
+        if flags & 0x80:
+            pts = dts = read_timestamp(packet, 9)
+        if flags & 0x40:
+            dts = read_timestamp(packet, 14)
+        return pts, dts, bytes(packet[9 + packet[8]:])
+
+    # --- Elementary streams ---
+
+    def video_track(self, packets):
+        samples = []  # [dts, pts, data, is_key]
+        sps = pps = None
+        for pts, dts, payload in packets:
+            units = []
+            key = False
+            for nal in split_nal_units(payload):
+                nal_type = nal[0] & 0x1F
+                if nal_type == 7:
+                    sps = sps or nal
+                elif nal_type == 8:
+                    pps = pps or nal
+                elif nal_type != 9:  # Access unit delimiters are not stored in MP4
+                    key = key or nal_type == 5
+                    units.append(struct.pack('>I', len(nal)))
+                    units.append(nal)
+            if units and pts is not None:
+                samples.append([dts, pts, b"".join(units), key])
+        if self.write_init and not (sps and pps):
+            raise RemuxError("no H.264 parameter sets in the first segment")
+
+        for sample, following in zip(samples, samples[1:]):
+            duration = following[0] - sample[0]
+            if duration > 0:
+                self.video_duration = duration
+            sample.append(max(duration, 0))
+        if samples:
+            samples[-1].append(self.video_duration)
+
+        return {"kind": "video", "timescale": VIDEO_TIMESCALE, "sps": sps, "pps": pps,
+                "base_time": samples[0][0] if samples else 0,
+                "samples": [(data, duration, SYNC_SAMPLE if key else NON_SYNC_SAMPLE, pts - dts)
+                            for dts, pts, data, key, duration in samples]}
+
+    def audio_track(self, packets):
+        frames = []
+        config = None
+        first_pts = None
+        for pts, _, payload in packets:
+            if first_pts is None:
+                first_pts = pts
+            pos = 0
+            while pos + 7 <= len(payload):
+                if payload[pos] != 0xFF or payload[pos + 1] & 0xF0 != 0xF0:
+                    break
+                header_size = 7 if payload[pos + 1] & 1 else 9
+                frame_size = ((payload[pos + 3] & 3) << 11) | (payload[pos + 4] << 3) | (payload[pos + 5] >> 5)
+                if frame_size <= header_size:
+                    break
+                if config is None:
+                    config = (((payload[pos + 2] >> 6) + 1),  # Audio object type
+                              (payload[pos + 2] >> 2) & 0x0F,  # Sample rate index
+                              ((payload[pos + 2] & 1) << 2) | (payload[pos + 3] >> 6))  # Channels
+                frames.append(payload[pos + header_size:pos + frame_size])
+                pos += frame_size
+        if config is None:
+            if self.audio_config is None:
+                # The first segment, or the first one a resumed download remuxes
+                raise RemuxError("no AAC frames to read the audio configuration from")
+            config = self.audio_config
+        self.audio_config = config
+
+        sample_rate = AAC_SAMPLE_RATES[config[1]] if config[1] < len(AAC_SAMPLE_RATES) else 44100
+        return {"kind": "audio", "timescale": sample_rate, "config": config,
+                "base_time": (first_pts or 0) * sample_rate // VIDEO_TIMESCALE,
+                "samples": [(frame, AAC_FRAME_SAMPLES, SYNC_SAMPLE, 0) for frame in frames]}
+
+    # --- MP4 boxes ---
+
+    def init_segment(self, tracks):
+        ftyp = box(b'ftyp', b'isom', struct.pack('>I', 0x200), b'isom', b'iso6', b'mp41')
+        mvhd = full_box(b'mvhd', 0, 0, struct.pack('>IIII', 0, 0, 1000, 0),
+                        struct.pack('>IH10x', 0x10000, 0x100), UNITY_MATRIX, bytes(24),
+                        struct.pack('>I', len(tracks) + 1))
+        traks = [self.trak(track) for track in tracks]
+        mvex = box(b'mvex', *[full_box(b'trex', 0, 0, struct.pack('>5I', track["id"], 1, 0, 0, 0))
+                              for track in tracks])
+        return ftyp + box(b'moov', mvhd, *traks, mvex)
+
+    def trak(self, track):
+        video = track["kind"] == "video"
+        width, height = sps_dimensions(track["sps"]) if video else (0, 0)
+        tkhd = full_box(b'tkhd', 0, 3, struct.pack('>IIIII', 0, 0, track["id"], 0, 0), bytes(8),
+                        struct.pack('>hhh2x', 0, 0, 0 if video else 0x100), UNITY_MATRIX,
+                        struct.pack('>II', width << 16, height << 16))
+        mdhd = full_box(b'mdhd', 0, 0, struct.pack('>IIIIHH', 0, 0, track["timescale"], 0, 0x55C4, 0))
+        hdlr = full_box(b'hdlr', 0, 0, bytes(4), b'vide' if video else b'soun', bytes(12),
+                        b'VideoHandler\x00' if video else b'SoundHandler\x00')
+        media_header = full_box(b'vmhd', 0, 1, bytes(8)) if video else full_box(b'smhd', 0, 0, bytes(4))
+        dinf = box(b'dinf', full_box(b'dref', 0, 0, struct.pack('>I', 1), full_box(b'url ', 0, 1)))
+        entry = self.avc1_entry(track, width, height) if video else self.mp4a_entry(track)
+        stbl = box(b'stbl', full_box(b'stsd', 0, 0, struct.pack('>I', 1), entry),
+                   full_box(b'stts', 0, 0, bytes(4)), full_box(b'stsc', 0, 0, bytes(4)),
+                   full_box(b'stsz', 0, 0, bytes(8)), full_box(b'stco', 0, 0, bytes(4)))
+        return box(b'trak', tkhd, box(b'mdia', mdhd, hdlr, box(b'minf', media_header, dinf, stbl)))
+
+    @staticmethod
+    def avc1_entry(track, width, height):
+        sps, pps = track["sps"], track["pps"]
+        avcc = box(b'avcC', bytes([1, sps[1], sps[2], sps[3], 0xFF, 0xE1]), struct.pack('>H', len(sps)), sps,
+                   bytes([1]), struct.pack('>H', len(pps)), pps)
+        return box(b'avc1', bytes(6), struct.pack('>H', 1), bytes(16), struct.pack('>HH', width, height),
+                   struct.pack('>IIIH', 0x480000, 0x480000, 0, 1), bytes(32), struct.pack('>Hh', 0x18, -1), avcc)
+
+    @staticmethod
+    def mp4a_entry(track):
+        object_type, rate_index, channels = track["config"]
+        if track["timescale"] > 0xFFFF:
+            # The sample entry holds the rate as 16.16 fixed point
+            raise RemuxError(f"{track['timescale']} Hz audio does not fit an MP4 sample entry")
+        audio_config = struct.pack('>H', (object_type << 11) | (rate_index << 7) | (channels << 3))
+        decoder_config = descriptor(4, bytes([0x40, 0x15]), bytes(11), descriptor(5, audio_config))
+        es = descriptor(3, struct.pack('>HB', track["id"], 0), decoder_config, descriptor(6, b'\x02'))
+        return box(b'mp4a', bytes(6), struct.pack('>H', 1), bytes(8),
+                   struct.pack('>HHHHI', channels or 2, 16, 0, 0, track["timescale"] << 16),
+                   full_box(b'esds', 0, 0, es))
+
+    @staticmethod
+    def fragment(tracks, sequence):
+        def traf(track, data_offset):
+            samples = track["samples"]
+            video = track["kind"] == "video"
+            flags = 0x001 | 0x100 | 0x200 | 0x400 | (0x800 if video else 0)
+            entries = b"".join(struct.pack('>IIII', duration, len(data), sample_flags, offset) if video
+                               else struct.pack('>III', duration, len(data), sample_flags)
+                               for data, duration, sample_flags, offset in samples)
+            return box(b'traf',
+                       full_box(b'tfhd', 0, 0x020000, struct.pack('>I', track["id"])),
+                       full_box(b'tfdt', 1, 0, struct.pack('>Q', track["base_time"])),
+                       full_box(b'trun', 0, flags, struct.pack('>Ii', len(samples), data_offset), entries))
+
+        tracks = [track for track in tracks if track["samples"]]
+        if not tracks:
+            return b""
+        mfhd = full_box(b'mfhd', 0, 0, struct.pack('>I', sequence))
+        # Data offsets are relative to the start of moof, whose size does not depend on them
+        moof_size = len(box(b'moof', mfhd, *[traf(track, 0) for track in tracks]))
+        offsets = []
+        position = moof_size + 8
+        for track in tracks:
+            offsets.append(position)
+            position += sum(len(sample[0]) for sample in track["samples"])
+        moof = box(b'moof', mfhd, *[traf(track, offset) for track, offset in zip(tracks, offsets)])
+        return moof + box(b'mdat', *[sample[0] for track in tracks for sample in track["samples"]])
+
+
+def descriptor(tag, *payloads):
+    payload = b"".join(payloads)
+    return bytes([tag, len(payload)]) + payload
+
+
+def read_timestamp(data, pos):
+    return (((data[pos] >> 1) & 0x07) << 30 | data[pos + 1] << 22 | (data[pos + 2] >> 1) << 15
+            | data[pos + 3] << 7 | data[pos + 4] >> 1)
+
+
+def unwrap_timestamp(timestamp, reference):
+    """The value congruent to `timestamp` modulo the 33-bit wrap that is closest to `reference`."""
+    if reference is None:
+        return timestamp
+    return timestamp + (reference - timestamp + TIMESTAMP_WRAP // 2) // TIMESTAMP_WRAP * TIMESTAMP_WRAP
+
+
+def split_nal_units(data):
+    """Splits an Annex B byte stream on its 00 00 01 start codes."""
+    units = []
+    start = data.find(b"\x00\x00\x01")
+    while start >= 0:
+        start += 3
+        end = data.find(b"\x00\x00\x01", start)
+        nal = data[start:end if end >= 0 else len(data)].rstrip(b"\x00")
+        if nal:
+            units.append(nal)
+        start = end
+    return units
+
+
+class BitReader:
+    def __init__(self, data):
+        self.value = int.from_bytes(data, 'big')
+        self.left = len(data) * 8
+
+    def read(self, bits):
+        if bits > self.left:
+            raise ValueError("read past the end of the SPS")
+        self.left -= bits
+        return (self.value >> self.left) & ((1 << bits) - 1)
+
+    def read_ue(self):
+        zeros = 0
+        while not self.read(1):
+            zeros += 1
+        return (1 << zeros) - 1 + self.read(zeros)
+
+    def read_se(self):
+        value = self.read_ue()
+        return (value + 1) // 2 if value & 1 else -(value // 2)
+
+
+def sps_dimensions(sps):
+    """Returns the (width, height) in pixels coded in an H.264 SPS NAL unit, or (0, 0)."""
+    try:
+        # Drop emulation prevention bytes (00 00 03 -> 00 00)
+        rbsp = sps[1:].replace(b"\x00\x00\x03", b"\x00\x00")
+        r = BitReader(rbsp)
+        profile = r.read(8)
+        r.read(16)  # Constraint flags, level
+        r.read_ue()  # SPS id
+        chroma_format = 1
+        if profile in (100, 110, 122, 244, 44, 83, 86, 118, 128, 138, 139, 134, 135):
+            chroma_format = r.read_ue()
+            if chroma_format == 3:
+                r.read(1)
+            r.read_ue()
+            r.read_ue()
+            r.read(1)
+            if r.read(1):  # Scaling matrices
+                for i in range(12 if chroma_format == 3 else 8):
+                    if r.read(1):
+                        last = following = 8
+                        for _ in range(16 if i < 6 else 64):
+                            if following:
+                                following = (last + r.read_se()) % 256
+                            last = following or last
+        r.read_ue()  # log2_max_frame_num
+        poc_type = r.read_ue()
+        if poc_type == 0:
+            r.read_ue()
+        elif poc_type == 1:
+            r.read(1)
+            r.read_se()
+            r.read_se()
+            for _ in range(r.read_ue()):
+                r.read_se()
+        r.read_ue()  # Reference frames
+        r.read(1)
+        width = (r.read_ue() + 1) * 16
+        height_units = r.read_ue() + 1
+        frame_mbs_only = r.read(1)
+        if not frame_mbs_only:
+            r.read(1)
+        r.read(1)
+        height = height_units * 16 * (2 - frame_mbs_only)
+        if r.read(1):  # Cropping
+            left, right, top, bottom = (r.read_ue() for _ in range(4))
+            crop_x = 2 if chroma_format in (1, 2) else 1
+            crop_y = (2 if chroma_format == 1 else 1) * (2 - frame_mbs_only)
+            width -= (left + right) * crop_x
+            height -= (top + bottom) * crop_y
+        return width, height
+    except ValueError as e:
+        print(f"[WARN] Could not read video size from SPS: {e}")
+        return 0, 0
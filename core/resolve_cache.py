@@ -0,0 +1,125 @@
+import json
+import os
+import re
+import threading
+import time
+from datetime import datetime, timezone
+from urllib.parse import urlsplit, parse_qsl
+
+CACHE_FILE = os.path.join("config", "resolve_cache.json")
+
+# Used when the media URL carries no recognisable expiry
+DEFAULT_TTL = 10 * 60
+# Stop handing out a URL this long before its token expires, so the download can finish
+EXPIRY_MARGIN = 5 * 60
+
+# Query parameters holding an absolute expiry as a Unix timestamp
+EXPIRY_PARAMS = ("expires", "expire", "expiry", "exp", "e", "x-expires", "x-oss-expires", "deadline", "validto")
+
+
+def token_expiry(media_url):
+    """
+    Returns the Unix time at which a signed media URL stops working, read from
+    its query string (CloudFront/OSS style Expires=, AWS X-Amz-Date +
+    X-Amz-Expires, Akamai hdnts=exp=...), or None if there is none.
+    """
+    params = {k.lower(): v for k, v in parse_qsl(urlsplit(media_url).query)}
+
+    for name in EXPIRY_PARAMS:
+        value = params.get(name, "")
+        if value.isdigit():
+            expiry = int(value)
+            if expiry > 10 ** 12:  # milliseconds
+                expiry //= 1000
+            if expiry > 10 ** 9:
+                return expiry
+
+    if "x-amz-date" in params and params.get("x-amz-expires", "").isdigit():
+        try:
+            signed = datetime.strptime(params["x-amz-date"], "%Y%m%dT%H%M%SZ").replace(tzinfo=timezone.utc)
+            return int(signed.timestamp()) + int(params["x-amz-expires"])
+        except ValueError:
+            pass
+
+    for name in ("hdnts", "__token__"):
+        match = re.search(r'(?:^|~)exp=(\d+)', params.get(name, ""))
+        if match:
+            return int(match.group(1))
+
+    return None
+
+
+class ResolveCache:
+    """
+    Episode page URL -> resolved media URL, persisted to config/ so retries
+    and re-downloads skip the page fetch while the media URL's token is valid.
+    """
+
+    def __init__(self, path=CACHE_FILE):
+        self.path = path
+        self.entries = {}  # episode_url: {"url": media_url, "expires": unix time}
+        self.lock = threading.Lock()
+        self._load()
+
+    def get(self, episode_url):
+        with self.lock:
+            entry = self.entries.get(episode_url)
+            if not entry:
+                return None
+            if entry["expires"] - EXPIRY_MARGIN <= time.time():
+                del self.entries[episode_url]
+                return None
+            return entry["url"]
+
+    def put(self, episode_url, media_url):
+        self.put_many({episode_url: media_url})
+
+    def put_many(self, resolved):
+        """Stores several episode_url: media_url pairs with a single write."""
+        if not resolved:
+            return
+        with self.lock:
+            for episode_url, media_url in resolved.items():
+                expires = token_expiry(media_url) or int(time.time()) + DEFAULT_TTL
+                self.entries[episode_url] = {"url": media_url, "expires": expires}
+            self._save()
+
+    def invalidate(self, episode_url):
+        """Forgets a URL, e.g. after the CDN rejected it."""
+        with self.lock:
+            if self.entries.pop(episode_url, None):
+                self._save()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self.entries = json.load(f)
+        except Exception as e:
+            print(f"[WARN] Ignoring unreadable resolve cache: {e}")
+
+    def _save(self):
+        # Drop expired entries so the file does not grow without bound
+        now = time.time()
+        self.entries = {k: v for k, v in self.entries.items() if v["expires"] - EXPIRY_MARGIN > now}
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.entries, f)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            print(f"[WARN] Failed to save resolve cache: {e}")
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_resolve_cache():
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResolveCache()
+        return _cache
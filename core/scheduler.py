@@ -0,0 +1,114 @@
+import threading
+from collections import deque
+from itertools import count
+
+
+class DownloadScheduler:
+    """
+    Keeps at most `max_concurrent` downloads running and starts queued ones,
+    in FIFO order, as slots free up.
+
+    `start_job(key, job)` is called to launch a job and returns a handle
+    (e.g. the worker); the owner calls `job_done(key)` once it has finished,
+    failed or been cancelled. All methods are thread safe.
+
+    If given, `prepare_job(key, job)` is called for the next `max_concurrent`
+    queued jobs whenever the queue moves, so their slow setup can run before
+    they start (see core.prefetch). It may be called repeatedly for a job.
+    """
+
+    def __init__(self, start_job, max_concurrent=3, prepare_job=None):
+        self.start_job = start_job
+        self.prepare_job = prepare_job
+        self.max_concurrent = max(1, int(max_concurrent))
+        # Removal is lazy: `queue` may hold entries whose key was removed (or
+        # removed and queued again), recognised by a ticket no longer in `queued`
+        self.queue = deque()  # (ticket, key)
+        self.queued = {}  # key: (ticket, job)
+        self.tickets = count()
+        self.active = {}  # key: handle
+        self.lock = threading.Lock()
+
+    def enqueue(self, key, job):
+        """Queues a job. Returns False if it is already queued or running."""
+        with self.lock:
+            if key in self.queued or key in self.active:
+                return False
+            ticket = next(self.tickets)
+            self.queue.append((ticket, key))
+            self.queued[key] = (ticket, job)
+        self._fill()
+        return True
+
+    def remove(self, key):
+        """Drops a job that has not started yet. Returns True if it was queued."""
+        with self.lock:
+            if self.queued.pop(key, None) is None:
+                return False
+            # Drop the stale entries once they outnumber the live ones
+            if len(self.queue) > 2 * len(self.queued) + 64:
+                self.queue = deque(self._live_entries())
+            return True
+
+    def job_done(self, key):
+        with self.lock:
+            self.active.pop(key, None)
+        self._fill()
+
+    def set_max_concurrent(self, limit):
+        """Changes the limit at runtime. Lowering it lets running jobs finish."""
+        with self.lock:
+            self.max_concurrent = max(1, int(limit))
+        self._fill()
+
+    def is_pending(self, key):
+        with self.lock:
+            return key in self.queued or key in self.active
+
+    def counts(self):
+        """Returns (active, queued)."""
+        with self.lock:
+            return len(self.active), len(self.queued)
+
+    def _live_entries(self):
+        # Queue entries still current, in order; call with the lock held
+        for ticket, key in self.queue:
+            entry = self.queued.get(key)
+            if entry is not None and entry[0] == ticket:
+                yield ticket, key
+
+    def _fill(self):
+        to_start = []
+        with self.lock:
+            while self.queue and len(self.active) < self.max_concurrent:
+                ticket, key = self.queue.popleft()
+                entry = self.queued.get(key)
+                if entry is None or entry[0] != ticket:
+                    continue
+                del self.queued[key]
+                self.active[key] = None
+                to_start.append((key, entry[1]))
+
+        for key, job in to_start:
+            try:
+                handle = self.start_job(key, job)
+            except Exception as e:
+                print(f"[ERROR] Failed to start job {key}: {e}")
+                self.job_done(key)
+                continue
+            with self.lock:
+                if key in self.active:
+                    self.active[key] = handle
+
+        if self.prepare_job:
+            with self.lock:
+                upcoming = []
+                for ticket, key in self._live_entries():
+                    if len(upcoming) == self.max_concurrent:
+                        break
+                    upcoming.append((key, self.queued[key][1]))
+            for key, job in upcoming:
+                try:
+                    self.prepare_job(key, job)
+                except Exception as e:
+                    print(f"[WARN] Failed to prepare job {key}: {e}")
@@ -0,0 +1,83 @@
+import asyncio
+import threading
+
+# Series scraped at the same time; further requests wait their turn
+MAX_CONCURRENT_SCRAPES = 4
+
+
+class ScrapeEngine:
+    """
+    Runs platform scrapes on an asyncio event loop in a background thread so
+    callers (e.g. the UI thread) never block on the network.
+
+    Results are reported through plain callbacks invoked from the engine's
+    thread; GUI code should forward them to its own thread (e.g. via Qt signals).
+    """
+
+    def __init__(self, max_concurrent=MAX_CONCURRENT_SCRAPES):
+        self.max_concurrent = max_concurrent
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self._run_loop, name="ScrapeEngine", daemon=True)
+        self.thread.start()
+        self.semaphore = self.call(self._create_semaphore).result()
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    async def _create_semaphore(self):
+        # Must be created on the loop that uses it
+        return asyncio.Semaphore(self.max_concurrent)
+
+    def call(self, coro_fn, *args):
+        """Schedules coro_fn(*args) on the engine loop; returns a concurrent.futures.Future."""
+        return asyncio.run_coroutine_threadsafe(coro_fn(*args), self.loop)
+
+    def scrap(self, platform, url, on_done=None, on_error=None, on_status=None, on_batch=None):
+        """
+        Scrapes `url` in the background. on_batch(url, videos) is called for every
+        batch as the platform finds it, then on_done(url, all_videos) at the end;
+        on_error(url, message) and on_status(url, message) as needed.
+        All callbacks run on the engine thread.
+        """
+        return self.call(self._scrap, platform, url, on_done, on_error, on_status, on_batch)
+
+    def resolve(self, platform, episode_url, on_done=None, on_error=None):
+        """Resolves an episode URL in the background; on_done(episode_url, video_url)."""
+        return self.call(self._resolve, platform, episode_url, on_done, on_error)
+
+    async def _scrap(self, platform, url, on_done, on_error, on_status, on_batch):
+        # Platforms report status from whatever thread they scrape on (the
+        # executor for sync ones); hand it over so on_status runs here too
+        status_callback = (lambda msg: self.loop.call_soon_threadsafe(on_status, url, msg)) if on_status else None
+        videos = []
+        async with self.semaphore:
+            try:
+                async for batch in platform.iter_scrap_async(url, status_callback=status_callback):
+                    videos.extend(batch)
+                    if on_batch:
+                        on_batch(url, batch)
+            except Exception as e:
+                print(f"[ERROR] Scrape failed for {url}: {e}")
+                if on_error:
+                    on_error(url, str(e))
+                return None
+        if on_done:
+            on_done(url, videos)
+        return videos
+
+    async def _resolve(self, platform, episode_url, on_done, on_error):
+        try:
+            video_url = await platform.resolve_video_url_async(episode_url)
+        except Exception as e:
+            print(f"[ERROR] Resolve failed for {episode_url}: {e}")
+            if on_error:
+                on_error(episode_url, str(e))
+            return None
+        if on_done:
+            on_done(episode_url, video_url)
+        return video_url
+
+    def shutdown(self):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(timeout=5)
@@ -0,0 +1,115 @@
+import os
+import threading
+from urllib.parse import urlsplit
+import cloudscraper
+
+# Keep-alive connections kept per host; must cover the segment/range workers of all jobs
+POOL_MAXSIZE = 64
+
+# Cookies exported from the browser, as config/<host>_cookies.txt
+COOKIE_FOLDER = "config"
+COOKIE_FILE_SUFFIX = "_cookies.txt"
+HTTP_ONLY_PREFIX = "#HttpOnly_"  # Marks HttpOnly cookies in cookies.txt; not a comment
+
+
+class SessionPool:
+    """
+    Process-wide CloudScraper sessions, one per host, shared by every worker
+    and platform so connections are kept alive between jobs and a solved
+    Cloudflare challenge is paid for only once.
+
+    All sessions share one cookie jar: clearance cookies set for
+    .example.com are sent to its CDN subdomains as usual. Cookies exported
+    from the browser into config/ are loaded into it once, keeping their
+    domains, so cdn.example.com gets the .example.com ones but not those
+    scoped to www.example.com.
+    """
+
+    def __init__(self, pool_maxsize=POOL_MAXSIZE):
+        self.pool_maxsize = pool_maxsize
+        self.sessions = {}  # host: CloudScraper
+        self.cookies = None
+        self.lock = threading.Lock()
+
+    def get(self, url):
+        """Returns the shared session for the host of `url` (or a bare host name)."""
+        host = urlsplit(url).hostname if "://" in url else url
+        host = (host or "").lower()
+        with self.lock:
+            session = self.sessions.get(host)
+            if session is None:
+                session = self._create(host)
+                self.sessions[host] = session
+            return session
+
+    def _create(self, host):
+        session = cloudscraper.create_scraper(
+            browser={
+                'browser': 'chrome',
+                'platform': 'windows',
+                'mobile': False
+            }
+        )
+        if self.cookies is None:
+            self.cookies = session.cookies
+            load_exported_cookies(self.cookies)
+        else:
+            session.cookies = self.cookies
+
+        # Default adapters keep only 10 idle connections per host
+        for adapter in session.adapters.values():
+            adapter._pool_maxsize = self.pool_maxsize
+            adapter.init_poolmanager(adapter._pool_connections, self.pool_maxsize, block=adapter._pool_block)
+
+        return session
+
+
+def load_exported_cookies(jar, folder=COOKIE_FOLDER):
+    """
+    Loads the Netscape cookies.txt files exported into `folder` (as
+    <host>_cookies.txt) into `jar` with their own domain and path, so each
+    is sent to the hosts it is scoped to, next to cookies the sessions earn.
+    """
+    try:
+        names = sorted(os.listdir(folder))
+    except OSError:
+        return
+    for file_name in names:
+        if not file_name.endswith(COOKIE_FILE_SUFFIX):
+            continue
+        host = file_name[:-len(COOKIE_FILE_SUFFIX)]
+        try:
+            count = 0
+            with open(os.path.join(folder, file_name), 'r') as f:
+                for line in f:
+                    if line.startswith(HTTP_ONLY_PREFIX):
+                        line = line[len(HTTP_ONLY_PREFIX):]
+                    elif line.startswith('#') or not line.strip():
+                        continue
+                    parts = line.strip().split('\t')
+                    if len(parts) >= 7:
+                        # domain, flag, path, secure, expiration, name, value
+                        jar.set(parts[5], parts[6], domain=parts[0], path=parts[2],
+                                secure=parts[3].upper() == "TRUE")
+                        count += 1
+            if count:
+                print(f"[DEBUG] Loaded {count} cookies exported for {host}")
+        except Exception as e:
+            print(f"[WARN] Failed to load cookies for {host}: {e}")
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_session_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = SessionPool()
+        return _pool
+
+
+def get_session(url):
+    """Shortcut for get_session_pool().get(url)."""
+    return get_session_pool().get(url)
@@ -1,10 +1,13 @@
 import sys
 from PyQt5.QtWidgets import QApplication
 from ui.main_window import DownloaderApp
+from core.metrics import METRICS_PORT, start_metrics_server
 
 def main():
     try:
         app = QApplication(sys.argv)
+        if METRICS_PORT:
+            start_metrics_server(int(METRICS_PORT))
         window = DownloaderApp()
         window.show()
         sys.exit(app.exec_())
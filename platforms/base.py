@@ -1,19 +1,30 @@
+import asyncio
 from abc import ABC, abstractmethod
 
 class BasePlatform(ABC):
+    """
+    A site the app can scrape. Which URLs reach a platform is decided by the
+    host it is registered for in core.manager (built in, or through the
+    "sdm.platforms" entry points), not by the platform itself.
+    """
+
     @abstractmethod
-    def can_handle(self, url):
-        """Returns True if this platform can handle the URL."""
+    def iter_scrap(self, url, status_callback=None):
+        """
+        Scraps the URL for videos, yielding them in batches (e.g. one per page)
+        as soon as they are found.
+        Each batch is a list of dicts with keys: 'title', 'url', 'platform'.
+        status_callback is a function that accepts a string for status updates.
+        """
         pass
 
-    @abstractmethod
     def scrap(self, url, status_callback=None):
         """
         Scraps the URL for videos. 
         Returns a list of dicts with keys: 'title', 'url', 'platform'.
         status_callback is a function that accepts a string for status updates.
         """
-        pass
+        return [video for batch in self.iter_scrap(url, status_callback) for video in batch]
 
     @abstractmethod
     def resolve_video_url(self, episode_url):
@@ -22,3 +33,39 @@ class BasePlatform(ABC):
         Returns the video URL string or None if failed.
         """
         pass
+
+    async def iter_scrap_async(self, url, status_callback=None):
+        """
+        Async variant of iter_scrap(). The default drives iter_scrap() on the
+        event loop's executor and hands each batch over as it is produced;
+        platforms with native async I/O can override it.
+        """
+        loop = asyncio.get_running_loop()
+        batches = asyncio.Queue()
+        done = object()
+
+        def produce():
+            try:
+                for batch in self.iter_scrap(url, status_callback):
+                    loop.call_soon_threadsafe(batches.put_nowait, batch)
+            except Exception as e:
+                loop.call_soon_threadsafe(batches.put_nowait, e)
+            loop.call_soon_threadsafe(batches.put_nowait, done)
+
+        loop.run_in_executor(None, produce)
+        while True:
+            batch = await batches.get()
+            if batch is done:
+                return
+            if isinstance(batch, Exception):
+                raise batch
+            yield batch
+
+    async def scrap_async(self, url, status_callback=None):
+        """Async variant of scrap(), see iter_scrap_async()."""
+        return [video async for batch in self.iter_scrap_async(url, status_callback) for video in batch]
+
+    async def resolve_video_url_async(self, episode_url):
+        """Async variant of resolve_video_url(), see scrap_async()."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.resolve_video_url, episode_url)
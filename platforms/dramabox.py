@@ -1,25 +1,71 @@
 import re
-import urllib.request
-import urllib.error
-import os
-from urllib.parse import urljoin
+import json
+from core.session import get_session
+from core.resolve_cache import get_resolve_cache
+from core.extract import extract_media_url, UrlRule, BlockRule, M3U8_URL, MP4_URL
 from .base import BasePlatform
 
-class DramaboxPlatform(BasePlatform):
-    def can_handle(self, url):
-        return "dramaboxdb.com" in url
+NEXT_DATA_START = '<script id="__NEXT_DATA__" type="application/json">'
+NEXT_DATA_END = '</script>'
+NEXT_DATA = re.compile(re.escape(NEXT_DATA_START) + r'(.*?)' + re.escape(NEXT_DATA_END), re.DOTALL)
+
+
+def parse_next_data(html):
+    """Returns the pageProps of the page's embedded Next.js __NEXT_DATA__ JSON, or None."""
+    match = NEXT_DATA.search(html)
+    if not match:
+        return None
+    try:
+        return json.loads(match.group(1)).get('props', {}).get('pageProps')
+    except ValueError as e:
+        print(f"[WARN] Invalid __NEXT_DATA__: {e}")
+        return None
+
+
+def chapter_stream_url(chapter):
+    return chapter.get('m3u8Url') or chapter.get('mp4')
+
+
+def next_data_block_stream_url(block, episode_url):
+    """BlockRule handler: the raw __NEXT_DATA__ JSON of an episode page."""
+    try:
+        page_props = json.loads(block).get('props', {}).get('pageProps')
+    except ValueError as e:
+        print(f"[WARN] Invalid __NEXT_DATA__: {e}")
+        return None
+    return episode_stream_url(page_props, episode_url)
+
+
+def episode_stream_url(page_props, episode_url):
+    if not page_props:
+        return None
+    chapter_id = episode_url.rstrip('/').split('/')[-1].split('_')[0]
+    if not chapter_id.isdigit():
+        chapter_id = str(page_props.get('chapterId', ''))
+    for chapter in page_props.get('chapterList') or []:
+        if str(chapter.get('id')) == chapter_id:
+            return chapter_stream_url(chapter)
+    return None
 
-    def scrap(self, start_url, status_callback=None):
+class DramaboxPlatform(BasePlatform):
+    def iter_scrap(self, start_url, status_callback=None):
         all_videos = []
         
         if status_callback:
             status_callback(f"Scraping Dramabox: {start_url}...")
 
         try:
-            headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'}
-            req = urllib.request.Request(start_url, headers=headers)
-            with urllib.request.urlopen(req) as response:
-                html = response.read().decode('utf-8')
+            response = get_session(start_url).get(start_url, timeout=30)
+            response.raise_for_status()
+            html = response.text
+
+            # Bulk mode: the page embeds every episode with its stream URL
+            videos = self.scrap_next_data(html, start_url)
+            if videos:
+                if status_callback:
+                    status_callback(f"Found {len(videos)} episodes.")
+                yield videos
+                return
                 
             # 1. Add current video
             current_title = "Unknown Episode"
@@ -76,51 +122,57 @@ class DramaboxPlatform(BasePlatform):
             if status_callback:
                 status_callback(f"Error: {e}")
             
-        return all_videos
+        if all_videos:
+            yield all_videos
+
+    def scrap_next_data(self, html, start_url):
+        """
+        Builds the whole episode list from __NEXT_DATA__ in one go. Unlocked
+        episodes carry 'episode_id' and 'stream_url', and their stream URLs are
+        seeded into the resolve cache so downloads skip fetching each episode page.
+        """
+        page_props = parse_next_data(html)
+        if not page_props or not page_props.get('chapterList'):
+            return []
+
+        base_match = re.search(r'/ep/(\d+_[^/]+)/', start_url)
+        if not base_match:
+            return []
+        base_path = base_match.group(1)
+        book_name = (page_props.get('bookInfo') or {}).get('bookName', '').strip()
+
+        videos = []
+        resolved = {}
+        for chapter in page_props['chapterList']:
+            number = int(chapter.get('index', len(videos))) + 1
+            full_url = f"https://www.dramaboxdb.com/ep/{base_path}/{chapter['id']}_Episode-{number}"
+            video = {
+                "title": f"{book_name} Episode {number}" if book_name else f"Episode {number}",
+                "url": full_url,
+                "platform": "Dramabox",
+                "episode_id": str(chapter['id']),
+            }
+            stream_url = chapter_stream_url(chapter)
+            if stream_url:
+                video["stream_url"] = stream_url
+                resolved[full_url] = stream_url
+            videos.append(video)
+
+        get_resolve_cache().put_many(resolved)
+        print(f"[DEBUG] __NEXT_DATA__: {len(videos)} episodes, {len(resolved)} with stream URLs")
+        return videos
+
+    # Preferred first: this episode's entry in __NEXT_DATA__, then any m3u8, then any mp4
+    RESOLVE_RULES = (
+        BlockRule(NEXT_DATA_START.encode(), NEXT_DATA_END.encode(), next_data_block_stream_url),
+        UrlRule(M3U8_URL),
+        UrlRule(MP4_URL),
+    )
 
     def resolve_video_url(self, episode_url):
         print(f"[DEBUG] Resolving Dramabox URL: {episode_url}")
         try:
-            headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'}
-            req = urllib.request.Request(episode_url, headers=headers)
-            with urllib.request.urlopen(req) as response:
-                html = response.read().decode('utf-8')
-            
-            # Save debug HTML
-            try:
-                with open("debug_dramabox_source.html", "w", encoding="utf-8") as f:
-                    f.write(html)
-            except:
-                pass
-
-            # Search for m3u8
-            # Look for common patterns: .m3u8 inside quotes
-            # Handle escaped slashes if JSON
-            video_match = re.search(r'(https?(?::|%3A)(?:/|%2F|\\/){2}[^"\'\s<>]+?\.m3u8)', html, re.IGNORECASE)
-            
-            if video_match:
-                found_url = video_match.group(1)
-                found_url = found_url.replace(r'\\/', '/')
-                found_url = found_url.replace('%3A', ':').replace('%2F', '/')
-                print(f"[DEBUG] Found m3u8 URL: {found_url}")
-                return found_url
-                
-            # If no m3u8, look for mp4
-            video_match_mp4 = re.search(r'(https?(?::|%3A)(?:/|%2F|\\/){2}[^"\'\s<>]+?\.mp4)', html, re.IGNORECASE)
-            if video_match_mp4:
-                found_url = video_match_mp4.group(1)
-                found_url = found_url.replace(r'\\/', '/')
-                found_url = found_url.replace('%3A', ':').replace('%2F', '/')
-                print(f"[DEBUG] Found mp4 URL: {found_url}")
-                return found_url
-
-            # Dump debug info if nothing found
-            print("[DEBUG] No video found. Dumping HTML snippet:")
-            print(html[:500])
-            with open("debug_dramabox.html", "w", encoding="utf-8") as f:
-                f.write(html)
-                
+            return extract_media_url(episode_url, self.RESOLVE_RULES)
         except Exception as e:
             print(f"[ERROR] Dramabox resolution failed: {e}")
-            
         return None
@@ -1,15 +1,38 @@
 import re
-import urllib.request
-import urllib.error
-from urllib.parse import urljoin
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin, urlsplit
+from core.session import get_session
+from core.metrics import get_metrics
+from core.extract import extract_media_url, UrlRule, MEDIA_URL, RELATIVE_MEDIA_URL
 from .base import BasePlatform
 
+EPISODE_LINK = re.compile(r'href=["\'](/episode/[^"\']+)["\']')
+
+# Listing pages requested ahead of the one being merged
+PREFETCH_DEPTH = 4
+# Concurrent requests allowed to one host while crawling
+MAX_PER_HOST = 2
+
+_host_slots = {}
+_host_slots_lock = threading.Lock()
+
+
+def _host_slot(url, limit):
+    host = urlsplit(url).hostname or ""
+    with _host_slots_lock:
+        if host not in _host_slots:
+            _host_slots[host] = threading.BoundedSemaphore(limit)
+        return _host_slots[host]
+
+
 class NetShortPlatform(BasePlatform):
-    def can_handle(self, url):
-        return "netshort.com" in url
+    def __init__(self, prefetch_depth=PREFETCH_DEPTH, max_per_host=MAX_PER_HOST):
+        self.prefetch_depth = max(1, prefetch_depth)
+        self.max_per_host = max(1, max_per_host)
 
-    def scrap(self, start_url, status_callback=None):
-        all_videos = []
+    def iter_scrap(self, start_url, status_callback=None):
         seen_links = set()
         
         # Determine base URL and starting page number
@@ -22,100 +45,106 @@ class NetShortPlatform(BasePlatform):
             base_url = start_url.rstrip('/')
             page_num = 1
             
-        current_url = start_url
-        headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'}
+        first_page = page_num
 
-        while True:
-            # Update status via callback if provided
-            if status_callback:
-                status_callback(f"Scraping Page {page_num}...")
-            
+        def page_url(num):
+            return start_url if num == first_page else f"{base_url}/page/{num}"
+
+        # Upcoming pages are fetched speculatively; results are merged strictly
+        # in page order, so the crawl stops at the same page as a serial one.
+        pool = ThreadPoolExecutor(max_workers=self.prefetch_depth)
+        pending = {}  # page_num: future
+        next_page = page_num
+        try:
+            while True:
+                while len(pending) < self.prefetch_depth:
+                    pending[next_page] = pool.submit(self.fetch_page, page_url(next_page))
+                    next_page += 1
+
+                # Update status via callback if provided
+                if status_callback:
+                    status_callback(f"Scraping Page {page_num}...")
+
+                current_url = page_url(page_num)
+                html = pending.pop(page_num).result()
+                if html is None:
+                    # 404 or similar means end of pages
+                    break
+
+                videos_on_page = self.parse_page(html, current_url, seen_links)
+
+                # If no *new* videos found on this page, assume we reached the end or a duplicate page
+                if not videos_on_page:
+                    break
+                    
+                # Hand each page over as soon as it is parsed
+                yield videos_on_page
+                page_num += 1
+        finally:
+            # Drop speculative requests past the last page
+            for future in pending.values():
+                future.cancel()
+            pool.shutdown(wait=False)
+
+    def fetch_page(self, url):
+        """Returns the page HTML, or None once pages run out."""
+        host = urlsplit(url).hostname or ""
+        with _host_slot(url, self.max_per_host):
             try:
-                req = urllib.request.Request(current_url, headers=headers)
-                with urllib.request.urlopen(req) as response:
-                    html = response.read().decode('utf-8')
-            except urllib.error.HTTPError as e:
-                # 404 or similar means end of pages
-                print(f"Stopping at {current_url}: HTTP {e.code}")
-                break
+                started = time.perf_counter()
+                response = get_session(url).get(url, timeout=30)
+                # `elapsed` stops at the headers; the body was read before get() returned
+                ttfb = response.elapsed.total_seconds()
+                metrics = get_metrics()
+                metrics.response(host, "listing", response.status_code)
+                metrics.request_done(host, "listing", ttfb, max(0.0, time.perf_counter() - started - ttfb),
+                                     len(response.content))
+                if response.status_code != 200:
+                    print(f"Stopping at {url}: HTTP {response.status_code}")
+                    return None
+                return response.text
             except Exception as e:
-                print(f"Error scraping {current_url}: {e}")
-                break
-            
-            # Netshort specific logic: find episode links
-            pattern = re.compile(r'href=["\'](/episode/[^"\']+)["\']')
-            matches = pattern.findall(html)
-            
-            videos_on_page = []
+                print(f"Error scraping {url}: {e}")
+                return None
+
+    def parse_page(self, html, current_url, seen_links):
+        # Netshort specific logic: find episode links
+        matches = EPISODE_LINK.findall(html)
+        
+        videos_on_page = []
+        
+        for match in matches:
+            # Avoid duplicates across pages
+            if match in seen_links:
+                continue
+            seen_links.add(match)
             
-            for match in matches:
-                # Avoid duplicates across pages
-                if match in seen_links:
-                    continue
-                seen_links.add(match)
-                
-                full_url = urljoin(current_url, match)
-                
-                title = match.split('/')[-1].replace('-', ' ').title()
-                # Simple cleanup for title
-                title = re.sub(r'-\d+$', '', title) # Remove trailing numbers if any
-                if len(title) > 30:
-                    title = title[:27] + "..."
-                    
-                videos_on_page.append({
-                    "title": title,
-                    "url": full_url,
-                    "platform": "NetShort"
-                })
+            full_url = urljoin(current_url, match)
             
-            # If no *new* videos found on this page, assume we reached the end or a duplicate page
-            if not videos_on_page:
-                break
+            title = match.split('/')[-1].replace('-', ' ').title()
+            # Simple cleanup for title
+            title = re.sub(r'-\d+$', '', title) # Remove trailing numbers if any
+            if len(title) > 30:
+                title = title[:27] + "..."
                 
-            all_videos.extend(videos_on_page)
-            
-            # Prepare next page
-            page_num += 1
-            current_url = f"{base_url}/page/{page_num}"
-            
-        return all_videos
+            videos_on_page.append({
+                "title": title,
+                "url": full_url,
+                "platform": "NetShort"
+            })
+        return videos_on_page
+
+    # Absolute media URLs first, then site-relative ones
+    RESOLVE_RULES = (UrlRule(MEDIA_URL), UrlRule(RELATIVE_MEDIA_URL))
 
     def resolve_video_url(self, episode_url):
-        # In a real scenario, this would request the episode_url, 
-        # find the <video> tag or m3u8 link, and return that.
-        # For this prototype, we'll try to find a video source or just return the page url
         print(f"[DEBUG] Resolving URL: {episode_url}")
         try:
-            headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'}
-            req = urllib.request.Request(episode_url, headers=headers)
-            with urllib.request.urlopen(req) as response:
-                html = response.read().decode('utf-8')
-                
-            # 1. Try standard/escaped absolute URLs (handling https:\/\/ style)
-            # Matches http or https, followed by :// or :\/\/ or :\\/\\/, then content, ending in mp4/m3u8
-            video_match = re.search(r'(https?(?::|%3A)(?:/|%2F|\\/){2}[^"\'\s<>]+?\.(?:mp4|m3u8))', html, re.IGNORECASE)
-            
-            if not video_match:
-                # 2. Try relative URLs inside quotes
-                video_match = re.search(r'["\'](/[^"\']+\.(?:mp4|m3u8))["\']', html, re.IGNORECASE)
-
-            if video_match:
-                found_url = video_match.group(1)
-                # Unescape slashes if found
-                found_url = found_url.replace(r'\/', '/')
-                
-                # Handle relative URL
-                if found_url.startswith('/'):
-                    from urllib.parse import urljoin
-                    found_url = urljoin(episode_url, found_url)
-                    
-                print(f"[DEBUG] Found video URL: {found_url}")
-                return found_url
-            else:
+            found_url = extract_media_url(episode_url, self.RESOLVE_RULES)
+            if not found_url:
                 print(f"[ERROR] No video pattern matched in HTML for {episode_url}")
-                return None
+            return found_url
         except Exception as e:
             print(f"[ERROR] resolve_video_url failed: {e}")
-            pass
             
         return None # Failed to resolve
@@ -0,0 +1,26 @@
+from PyQt5.QtCore import QThread, pyqtSignal
+from core.downloader import DownloadTask
+
+
+class DownloadWorker(QThread):
+    """Runs a DownloadTask on a QThread and turns its callbacks into signals."""
+    progress = pyqtSignal(int, int, int) # job_id, percentage, speed (kbps)
+    finished = pyqtSignal(int, str) # job_id, status message
+    error = pyqtSignal(int, str) # job_id, error message
+
+    def __init__(self, job_id, video_data, download_path, **options):
+        super().__init__()
+        self.task = DownloadTask(job_id, video_data, download_path,
+                                 on_progress=self.progress.emit,
+                                 on_finished=self.finished.emit,
+                                 on_error=self.error.emit,
+                                 **options)
+
+    def run(self):
+        self.task.run()
+
+    def cancel(self):
+        self.task.cancel()
+
+    def pause(self):
+        self.task.pause()
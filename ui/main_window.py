@@ -2,19 +2,42 @@ import datetime
 import os
 from PyQt5.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, 
                              QHBoxLayout, QPushButton, QLabel, QLineEdit, 
-                             QTableWidget, QTableWidgetItem, QTabWidget, 
+                             QTableView, QAbstractItemView, QTabWidget, 
                              QGroupBox, QHeaderView, QSplitter, QMenu, QAction,
-                             QApplication, QMessageBox)
-from PyQt5.QtCore import Qt, QTimer, QUrl
+                             QApplication, QMessageBox, QCheckBox)
+from PyQt5.QtCore import Qt, QTimer, QUrl, QObject, pyqtSignal
 from PyQt5.QtGui import QPixmap, QDesktopServices
-from core.manager import PlatformManager
-from core.downloader import DownloadWorker
+from core.manager import get_platform_manager
+from ui.download_worker import DownloadWorker
+from core.downloader import DownloadTask
+from core.scheduler import DownloadScheduler
+from core.prefetch import Prefetcher
+from core.ratelimit import get_rate_limiter, parse_rate
+from core.hls import VariantPolicy, parse_quality
+from core.scrape_engine import ScrapeEngine
+from core.job_store import ColumnStore, create_job_store
+from core.job_db import (JobDatabase, UNFINISHED_STATES, RESUMABLE_STATES, JOB_STATES, FINISHED_STATES,
+                         JOB_NEW, JOB_QUEUED, JOB_ACTIVE, JOB_PAUSED, JOB_COMPLETED, JOB_ERROR)
+from core.progress import ProgressBoard, format_bytes, format_eta
+from ui.table_model import StoreTableModel
 
 # --- Constants ---
 # User preferred color
 ACCENT_COLOR = "#032EA1"
 TEXT_COLOR_ON_ACCENT = "#FFFFFF"
 
+# How often download progress is repainted (10 frames per second)
+PROGRESS_REFRESH_MS = 100
+# How often pending job changes are written to the job database
+JOB_FLUSH_MS = 1000
+
+class ScrapeSignals(QObject):
+    """Carries ScrapeEngine callbacks from its background thread to the UI thread."""
+    status = pyqtSignal(str, str) # url, message
+    batch = pyqtSignal(str, object) # url, list of video dicts found so far
+    done = pyqtSignal(str, object) # url, list of all video dicts
+    failed = pyqtSignal(str, str) # url, error message
+
 class DownloaderApp(QMainWindow):
     def __init__(self):
         super().__init__()
@@ -22,8 +45,38 @@ class DownloaderApp(QMainWindow):
         self.setWindowTitle("SDM - Downloader Manager")
         self.resize(1200, 800)
         
-        self.platform_manager = PlatformManager()
-        self.active_downloads = {} # row_id: DownloadWorker
+        self.platform_manager = get_platform_manager()
+        self.active_downloads = {} # job ID: DownloadWorker
+        # Released workers, kept referenced until their final signal has been
+        # handled and their thread has exited: worker -> final signal handled
+        self.finished_workers = {}
+        # Jobs next in line are resolved while the running ones download
+        self.prefetcher = Prefetcher()
+        self.scheduler = DownloadScheduler(self.launch_download, max_concurrent=3,
+                                           prepare_job=self.prepare_download)
+        self.variant_policy = VariantPolicy()
+
+        # Workers write progress to the board; one timer applies it to the table
+        self.progress_board = ProgressBoard()
+        self.progress_timer = QTimer()
+        self.progress_timer.timeout.connect(self.apply_progress)
+        self.progress_timer.start(PROGRESS_REFRESH_MS)
+
+        # The download queue survives restarts and crashes
+        self.job_db = JobDatabase()
+        self.job_flush_timer = QTimer()
+        self.job_flush_timer.timeout.connect(self.job_db.flush)
+        self.job_flush_timer.start(JOB_FLUSH_MS)
+
+        # Scraping runs on a background event loop; results come back as signals
+        self.scrape_engine = ScrapeEngine()
+        self.scrape_signals = ScrapeSignals()
+        self.scrape_signals.status.connect(self.on_scrape_status)
+        self.scrape_signals.batch.connect(self.on_scrape_batch)
+        self.scrape_signals.done.connect(self.on_scrape_done)
+        self.scrape_signals.failed.connect(self.on_scrape_failed)
+        self.scrapes_running = 0
+        self.auto_download_urls = set() # Scraped URLs whose episodes start downloading as found
         
         # Apply Global Theme (Light Mode with Custom Accent)
         self.apply_theme()
@@ -74,7 +127,7 @@ class DownloaderApp(QMainWindow):
             QPushButton:pressed {{
                 background-color: #022075;
             }}
-            QTableWidget {{
+            QTableView {{
                 background-color: #FFFFFF;
                 border: 1px solid #CCCCCC;
                 selection-background-color: {ACCENT_COLOR};
@@ -172,16 +225,17 @@ class DownloaderApp(QMainWindow):
         left_layout.addWidget(self.url_queue_label)
 
         # Left Table: URL Table
-        self.url_table = QTableWidget()
+        self.url_store = ColumnStore(("url",), key="url")
+        self.url_model = StoreTableModel(self.url_store, ["ID", "URL"], ["id", "url"])
+        self.url_table = QTableView()
+        self.url_table.setModel(self.url_model)
         self.url_table.setContextMenuPolicy(Qt.CustomContextMenu)
         self.url_table.customContextMenuRequested.connect(self.show_url_table_context_menu)
-        self.url_table.setColumnCount(2)
-        self.url_table.setHorizontalHeaderLabels(["ID", "URL"])
+        self.url_table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.url_table.verticalHeader().setVisible(False)
         self.url_table.horizontalHeader().setSectionResizeMode(1, QHeaderView.Stretch)
         
-        self.url_table.setRowCount(1)
-        self.url_table.setItem(0, 0, QTableWidgetItem("1"))
-        self.url_table.setItem(0, 1, QTableWidgetItem("https://www.netshort.com/full-episodes/the-heiress-returns"))
+        self.url_model.add_rows([{"url": "https://www.netshort.com/full-episodes/the-heiress-returns"}])
         left_layout.addWidget(self.url_table)
 
         # Right Table Container
@@ -194,22 +248,35 @@ class DownloaderApp(QMainWindow):
         right_layout.addWidget(self.activity_label)
 
         # Right Table: Download Activity
-        self.dl_table = QTableWidget()
+        # Rows live in a columnar store; the view only renders what is visible
+        self.dl_store = create_job_store()
+        self.dl_model = StoreTableModel(self.dl_store,
+                                        ["ID", "Title", "URL", "Status", "Type", "Platform", "Size", "Speed", "ETA"],
+                                        ["id", "title", "url", "status", "type", "platform", "size", "speed", "eta"])
+        self.dl_table = QTableView()
+        self.dl_table.setModel(self.dl_model)
+        self.dl_table.horizontalHeader().setSortIndicatorShown(True)
+        self.dl_table.horizontalHeader().sectionClicked.connect(self.sort_dl_table)
         self.dl_table.setContextMenuPolicy(Qt.CustomContextMenu)
         self.dl_table.customContextMenuRequested.connect(self.show_dl_table_context_menu)
-        self.dl_table.setSelectionBehavior(QTableWidget.SelectRows)
-        self.dl_table.setColumnCount(7)
-        self.dl_table.setHorizontalHeaderLabels(["ID", "Title", "URL", "Status", "Type", "Platform", "Size"])
+        self.dl_table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.dl_table.verticalHeader().setVisible(False)
         self.dl_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
         
-        self.dl_table.setRowCount(1)
-        self.dl_table.setItem(0, 0, QTableWidgetItem("101"))
-        self.dl_table.setItem(0, 1, QTableWidgetItem("My Video"))
-        self.dl_table.setItem(0, 2, QTableWidgetItem(".../video.mp4"))
-        self.dl_table.setItem(0, 3, QTableWidgetItem("Downloading"))
-        self.dl_table.setItem(0, 4, QTableWidgetItem("Video"))
-        self.dl_table.setItem(0, 5, QTableWidgetItem("YouTube"))
-        self.dl_table.setItem(0, 6, QTableWidgetItem("45 MB"))
+        saved_jobs = self.job_db.load()
+        if saved_jobs:
+            self.dl_model.add_rows(saved_jobs)
+            # Jobs queued or downloading when the app last exited resume once the UI is up
+            QTimer.singleShot(0, self.resume_unfinished_jobs)
+        else:
+            self.dl_model.add_rows([{
+                "title": "My Video",
+                "url": ".../video.mp4",
+                "status": "Downloading",
+                "type": "Video",
+                "platform": "YouTube",
+                "size": "45 MB",
+            }])
         right_layout.addWidget(self.dl_table)
 
         splitter = QSplitter(Qt.Horizontal)
@@ -236,9 +303,28 @@ class DownloaderApp(QMainWindow):
 
         opt_layout = QHBoxLayout()
         opt_layout.addWidget(QLabel("Concurrent Downloads:"))
-        opt_layout.addWidget(QLineEdit("3"))
+        self.concurrent_input = QLineEdit(str(self.scheduler.max_concurrent))
+        self.concurrent_input.editingFinished.connect(self.apply_concurrency_setting)
+        opt_layout.addWidget(self.concurrent_input)
         opt_layout.addWidget(QLabel("Speed Limit:"))
-        opt_layout.addWidget(QLineEdit("Unlimited"))
+        self.speed_limit_input = QLineEdit("Unlimited")
+        self.speed_limit_input.setToolTip("Total for all downloads, e.g. 500 KB/s or 2 MB/s")
+        self.speed_limit_input.editingFinished.connect(self.apply_speed_limit_setting)
+        opt_layout.addWidget(self.speed_limit_input)
+        opt_layout.addWidget(QLabel("Per-Host Limit:"))
+        self.host_limit_input = QLineEdit("Unlimited")
+        self.host_limit_input.setToolTip("Cap for each server host separately")
+        self.host_limit_input.editingFinished.connect(self.apply_speed_limit_setting)
+        opt_layout.addWidget(self.host_limit_input)
+        opt_layout.addWidget(QLabel("Quality:"))
+        self.quality_input = QLineEdit(str(self.variant_policy))
+        self.quality_input.setToolTip("Best, a height cap such as 720p, or Auto to step down "
+                                      "when the connection is too slow (e.g. Auto 720p)")
+        self.quality_input.editingFinished.connect(self.apply_quality_setting)
+        opt_layout.addWidget(self.quality_input)
+        self.remux_checkbox = QCheckBox("Remux HLS to MP4")
+        self.remux_checkbox.setToolTip("Write streamed episodes as real MP4 files (no re-encoding)")
+        opt_layout.addWidget(self.remux_checkbox)
         opt_layout.addStretch()
         row5_layout.addLayout(opt_layout)
 
@@ -279,6 +365,10 @@ class DownloaderApp(QMainWindow):
         scrap_action = QAction("Scrap", self)
         scrap_action.triggered.connect(self.scrap_selected_url)
         menu.addAction(scrap_action)
+
+        scrap_download_action = QAction("Scrap && Download", self)
+        scrap_download_action.triggered.connect(lambda: self.scrap_selected_url(auto_download=True))
+        menu.addAction(scrap_download_action)
         
         menu.addSeparator()
         
@@ -309,15 +399,17 @@ class DownloaderApp(QMainWindow):
 
     def process_pasted_urls(self, urls):
         invalid_urls = []
-        added_count = 0
+        valid_urls = []
         
+        # Host lookup only; platform modules load when a URL is scraped
         for url in urls:
-            platform = self.platform_manager.get_platform_for_url(url)
-            if platform:
-                self.add_url_to_table(url)
-                added_count += 1
+            if self.platform_manager.handles(url):
+                valid_urls.append(url)
             else:
                 invalid_urls.append(url)
+
+        # Duplicates are dropped by the store's URL index
+        added_count = len(self.url_model.add_rows({"url": url} for url in valid_urls))
         
         if invalid_urls:
             msg = "The following URLs are not supported:\n\n"
@@ -330,16 +422,7 @@ class DownloaderApp(QMainWindow):
             self.status_label.setText(f"Added {added_count} URLs to queue.")
 
     def add_url_to_table(self, url):
-        # Check if already exists to avoid duplicates (optional but good UX)
-        for row in range(self.url_table.rowCount()):
-            item = self.url_table.item(row, 1)
-            if item and item.text() == url:
-                return
-
-        row = self.url_table.rowCount()
-        self.url_table.insertRow(row)
-        self.url_table.setItem(row, 0, QTableWidgetItem(str(row + 1)))
-        self.url_table.setItem(row, 1, QTableWidgetItem(url))
+        self.url_model.add_rows([{"url": url}])
 
     def show_dl_table_context_menu(self, position):
         menu = QMenu()
@@ -348,8 +431,20 @@ class DownloaderApp(QMainWindow):
         menu.addAction(select_all_action)
         
         download_action = QAction("Download Selected", self)
-        download_action.triggered.connect(self.download_selected_items)
+        download_action.triggered.connect(lambda: self.download_selected_items())
         menu.addAction(download_action)
+
+        pause_action = QAction("Pause", self)
+        pause_action.triggered.connect(self.pause_selected_items)
+        menu.addAction(pause_action)
+
+        resume_action = QAction("Resume", self)
+        resume_action.triggered.connect(self.resume_selected_items)
+        menu.addAction(resume_action)
+
+        redownload_action = QAction("Re-download", self)
+        redownload_action.triggered.connect(self.redownload_selected_items)
+        menu.addAction(redownload_action)
         
         menu.addSeparator()
         
@@ -365,26 +460,68 @@ class DownloaderApp(QMainWindow):
 
     def select_all_dl_items(self):
         self.dl_table.selectAll()
+
+    def selected_dl_rows(self):
+        """Store rows of the selected activity table rows (the view may be sorted)."""
+        return sorted(set(self.dl_model.store_row(index.row())
+                          for index in self.dl_table.selectionModel().selectedRows()))
+
+    def sort_dl_table(self, column):
+        header = self.dl_table.horizontalHeader()
+        self.dl_model.sort(column, header.sortIndicatorOrder())
+
+    def job_id(self, row):
+        return self.dl_store.get(row, "id")
+
+    def update_jobs(self, updates):
+        """Applies {store row: {column: value}} to the table and queues the rows for saving."""
+        self.dl_model.set_values(updates)
+        self.job_db.save(self.dl_store.row_dict(row) for row in updates)
+
+    def set_status(self, row, status, state=None):
+        values = {"status": status}
+        if state:
+            values["state"] = state
+        self.update_jobs({row: values})
+
+    def resume_unfinished_jobs(self):
+        rows = [row for row in map(self.dl_store.row_of, self.job_db.ids_in_state(*UNFINISHED_STATES))
+                if row is not None]
+        if rows:
+            self.start_download_for_rows(rows)
+            self.status_label.setText(f"Resuming {len(rows)} unfinished downloads.")
         
     def delete_selected_items(self):
-        # Iterate in reverse order to avoid index shifting issues when removing
-        rows_to_remove = sorted([item.row() for item in self.dl_table.selectedItems()], reverse=True)
-        # Use set to process each row only once (since multiple items can be selected in same row)
-        unique_rows = []
-        seen = set()
-        for r in rows_to_remove:
-            if r not in seen:
-                unique_rows.append(r)
-                seen.add(r)
-        
-        for row in unique_rows:
-            # Cancel active download if any
-            if row in self.active_downloads:
-                self.active_downloads[row].cancel()
-                del self.active_downloads[row]
+        rows = self.selected_dl_rows()
+        job_ids = [self.job_id(row) for row in rows]
+
+        # Dequeue the whole selection before freeing any slot, or each
+        # released download would start the next selected job
+        for job_id in job_ids:
+            self.scheduler.remove(job_id)
+            self.prefetcher.discard(job_id)
+        for job_id in job_ids:
+            if job_id in self.active_downloads:
+                self.active_downloads[job_id].cancel()
+                self.release_download(job_id)
             
-            # Remove from table
-            self.dl_table.removeRow(row)
+        # Remove from table and database in one pass
+        self.job_db.delete(job_ids)
+        self.dl_model.remove_rows(rows)
+
+    def pause_selected_items(self):
+        # Paused downloads keep their partial data; "Resume" picks them up again
+        updates = {}
+        for row in self.selected_dl_rows():
+            job_id = self.job_id(row)
+            if self.scheduler.remove(job_id):
+                self.prefetcher.discard(job_id)
+                updates[row] = {"status": "Paused", "state": JOB_PAUSED}
+            elif job_id in self.active_downloads:
+                self.active_downloads[job_id].pause()
+                updates[row] = {"status": "Pausing..."}
+        # One table update and database save for the whole selection
+        self.update_jobs(updates)
 
     def open_selected_folder(self):
         # Determine path (from input for now, ideally per-item if stored)
@@ -395,118 +532,276 @@ class DownloaderApp(QMainWindow):
             self.status_label.setText(f"Folder does not exist: {path}")
 
     def download_all_items(self):
-        all_rows = set(range(self.dl_table.rowCount()))
+        all_rows = set(range(len(self.dl_store)))
         self.start_download_for_rows(all_rows)
 
-    def download_selected_items(self):
-        selected_rows = set()
-        for item in self.dl_table.selectedItems():
-            selected_rows.add(item.row())
+    def download_selected_items(self, states=None):
+        selected_rows = self.selected_dl_rows()
             
         if not selected_rows:
             self.status_label.setText("No items selected for download.")
             return
 
-        self.start_download_for_rows(selected_rows)
+        self.start_download_for_rows(selected_rows, states)
 
-    def start_download_for_rows(self, rows):
-        self.status_label.setText(f"Starting download for {len(rows)} items...")
-        
+    def resume_selected_items(self):
+        self.download_selected_items(RESUMABLE_STATES)
+
+    def redownload_selected_items(self):
+        # The only way to download a completed job again, overwriting its file
+        self.download_selected_items(JOB_STATES)
+
+    def start_download_for_rows(self, rows, states=None):
+        """Queues the rows whose job state is in `states`; by default every row not completed yet."""
         download_path = self.video_path_input.text()
-        
-        for row in rows:
-            if row in self.active_downloads:
-                continue # Already downloading
+        queued = 0
+        skipped = 0
+        
+        for row in sorted(rows):
+            job_id = self.job_id(row)
+            if self.scheduler.is_pending(job_id):
+                continue # Already queued or downloading
+            state = self.dl_model.value(row, "state") or JOB_NEW
+            if (state == JOB_COMPLETED) if states is None else (state not in states):
+                skipped += 1
+                continue
                 
-            # Get data from table
-            title_item = self.dl_table.item(row, 1)
-            url_item = self.dl_table.item(row, 2)
-            platform_item = self.dl_table.item(row, 5)
+            # Get data from the store
+            title = self.dl_model.value(row, "title")
+            url = self.dl_model.value(row, "url")
             
-            # Safety check if items are valid
-            if not title_item or not url_item:
+            # Safety check if values are valid
+            if not title or not url:
                 continue
 
-            title = title_item.text()
-            url = url_item.text()
-            platform = platform_item.text() if platform_item else "Unknown"
-            
-            video_data = {
+            video_data = dict(self.dl_model.value(row, "extra") or {})
+            video_data.update({
                 "title": title,
                 "url": url,
-                "platform": platform
-            }
+                "platform": self.dl_model.value(row, "platform") or "Unknown"
+            })
             
-            # Update Status
-            self.dl_table.setItem(row, 3, QTableWidgetItem("Starting..."))
-            
-            # Create Worker
-            worker = DownloadWorker(row, video_data, download_path)
-            worker.progress.connect(self.on_download_progress)
-            worker.finished.connect(self.on_download_finished)
-            worker.error.connect(self.on_download_error)
-            
-            self.active_downloads[row] = worker
-            worker.start()
+            # Update Status; the scheduler starts it once a slot is free
+            self.set_status(row, "Queued", JOB_QUEUED)
+            self.scheduler.enqueue(job_id, (video_data, download_path))
+            queued += 1
+
+        active, waiting = self.scheduler.counts()
+        message = f"Queued {queued} items ({active} downloading, {waiting} waiting)."
+        if skipped:
+            message += f" Skipped {skipped} completed or not resumable."
+        self.status_label.setText(message)
 
-    def on_download_progress(self, row, percent, speed):
-        self.dl_table.setItem(row, 3, QTableWidgetItem(f"Downloading {percent}%"))
-        
-    def on_download_finished(self, row, status):
-        self.dl_table.setItem(row, 3, QTableWidgetItem(status))
-        if row in self.active_downloads:
-            del self.active_downloads[row]
-            
-    def on_download_error(self, row, error_msg):
-        self.dl_table.setItem(row, 3, QTableWidgetItem("Error"))
-        # Optional: Show error in tooltip or log
-        self.status_label.setText(f"Error on row {row}: {error_msg}")
-        if row in self.active_downloads:
-            del self.active_downloads[row]
+    def prepare_download(self, job_id, job):
+        """Called by the scheduler for jobs about to get a slot."""
+        video_data, download_path = job
+        self.prefetcher.submit(job_id, lambda: DownloadTask(job_id, video_data, download_path,
+                                                            variant_policy=self.variant_policy).prepare())
+
+    def launch_download(self, job_id, job):
+        """Called by the scheduler when a slot frees up."""
+        row = self.dl_store.row_of(job_id)
+        if row is None:
+            raise ValueError("job is no longer listed")
+        video_data, download_path = job
+        self.set_status(row, "Starting...", JOB_ACTIVE)
+
+        # Create Worker
+        worker = DownloadWorker(job_id, video_data, download_path, progress_board=self.progress_board,
+                                remux=self.remux_checkbox.isChecked(), variant_policy=self.variant_policy,
+                                prefetched=self.prefetcher.take(job_id))
+        worker.finished.connect(self.on_download_finished)
+        worker.error.connect(self.on_download_error)
+        
+        self.active_downloads[job_id] = worker
+        worker.start()
+        return worker
+
+    def apply_concurrency_setting(self):
+        try:
+            limit = int(self.concurrent_input.text())
+            if limit < 1:
+                raise ValueError
+        except ValueError:
+            self.concurrent_input.setText(str(self.scheduler.max_concurrent))
+            return
+        self.scheduler.set_max_concurrent(limit)
+        self.status_label.setText(f"Concurrent downloads set to {limit}.")
 
-    def scrap_selected_url(self):
-        current_row = self.url_table.currentRow()
-        if current_row < 0:
+    def apply_speed_limit_setting(self):
+        limiter = get_rate_limiter()
+        try:
+            rate = parse_rate(self.speed_limit_input.text())
+            host_rate = parse_rate(self.host_limit_input.text())
+        except ValueError as e:
+            self.status_label.setText(str(e))
             return
-            
-        url_item = self.url_table.item(current_row, 1)
-        if not url_item:
+        limiter.set_rate(rate)
+        limiter.set_host_rate(host_rate)
+        self.status_label.setText("Speed limit updated.")
+
+    def apply_quality_setting(self):
+        try:
+            max_height, adaptive = parse_quality(self.quality_input.text())
+        except ValueError as e:
+            self.status_label.setText(str(e))
+            self.quality_input.setText(str(self.variant_policy))
+            return
+        self.variant_policy.set_quality(max_height, adaptive)
+        self.quality_input.setText(str(self.variant_policy))
+        self.status_label.setText(f"Quality set to {self.variant_policy}.")
+
+    def release_download(self, job_id, signalled=False):
+        """
+        Frees the job's slot. `signalled` is True when called for the worker's
+        final signal; a worker released before it (e.g. a deleted row) is kept
+        until that signal has been delivered, or PyQt would deliver it without
+        a sender.
+        """
+        self.progress_board.remove(job_id)
+        row = self.dl_store.row_of(job_id)
+        if row is not None:
+            self.dl_model.set_values({row: {"speed": None, "eta": None}})
+        worker = self.active_downloads.pop(job_id, None)
+        if worker:
+            self.finished_workers[worker] = signalled
+        self.prune_finished_workers()
+        self.scheduler.job_done(job_id)
+
+    def prune_finished_workers(self):
+        # Signals arrive before run() returns; hold the QThread until it exits
+        self.finished_workers = {worker: signalled for worker, signalled in self.finished_workers.items()
+                                 if not (signalled and worker.isFinished())}
+
+    def is_current_worker(self, job_id):
+        """True if the signal being handled comes from the job's running worker."""
+        worker = self.sender()
+        if worker is not None and worker is self.active_downloads.get(job_id):
+            return True
+        # A worker released early emitting its final signal
+        if worker in self.finished_workers:
+            self.finished_workers[worker] = True
+            self.prune_finished_workers()
+        return False
+
+    def apply_progress(self):
+        """Timer tick: applies every progress change since the last tick in one repaint."""
+        if self.finished_workers:
+            self.prune_finished_workers()
+        updates = {}
+        for job_id, percent, speed, eta, total_bytes in self.progress_board.drain():
+            row = self.dl_store.row_of(job_id)
+            if row is None or job_id not in self.active_downloads:
+                continue
+            values = {"status": f"Downloading {percent}%",
+                      "speed": f"{format_bytes(speed)}/s",
+                      "eta": format_eta(eta)}
+            if total_bytes:
+                values["size"] = format_bytes(total_bytes)
+            updates[row] = values
+        if updates:
+            self.update_jobs(updates)
+
+    def on_download_finished(self, job_id, status):
+        if not self.is_current_worker(job_id):
             return
+        # Cancelled jobs are not resumed on the next start, only paused ones
+        state = FINISHED_STATES.get(status, JOB_ERROR)
+        row = self.dl_store.row_of(job_id)
+        values = {"status": status, "state": state}
+        variant = self.active_downloads[job_id].task.variant
+        if variant:
+            # Saved with the job, so it is known which rendition each episode ended up with
+            values["extra"] = dict(self.dl_model.value(row, "extra") or {}, variant=variant.label())
+        self.update_jobs({row: values})
+        self.release_download(job_id, signalled=True)
             
-        url = url_item.text()
-        self.status_label.setText(f"Checking for platform: {url}...")
-        QApplication.processEvents()
-        
-        platform = self.platform_manager.get_platform_for_url(url)
-        if not platform:
-            self.status_label.setText(f"No platform found for this URL.")
+    def on_download_error(self, job_id, error_msg):
+        if not self.is_current_worker(job_id):
             return
+        self.set_status(self.dl_store.row_of(job_id), "Error", JOB_ERROR)
+        # Optional: Show error in tooltip or log
+        self.status_label.setText(f"Error on job {job_id}: {error_msg}")
+        self.release_download(job_id, signalled=True)
 
-        try:
-            # Pass a lambda to update the status label from the plugin
-            videos = platform.scrap(url, status_callback=lambda msg: self.update_status(msg))
-            self.add_videos_to_dl_table(videos)
-            self.status_label.setText(f"Scraping complete. Found {len(videos)} videos.")
-        except Exception as e:
-            self.status_label.setText(f"Error scraping: {str(e)}")
+    def scrap_selected_url(self, auto_download=False):
+        rows = sorted(set(index.row() for index in self.url_table.selectionModel().selectedRows()))
+        if not rows and self.url_table.currentIndex().isValid():
+            rows = [self.url_table.currentIndex().row()]
+            
+        for row in rows:
+            url = self.url_model.value(row, "url")
+            if not url:
+                continue
+
+            platform = self.platform_manager.get_platform_for_url(url)
+            if not platform:
+                self.status_label.setText(f"No platform found for this URL.")
+                continue
+
+            # Several series can be scraped at once; the UI stays responsive
+            self.scrapes_running += 1
+            if auto_download:
+                self.auto_download_urls.add(url)
+            self.scrape_engine.scrap(platform, url,
+                                     on_batch=self.scrape_signals.batch.emit,
+                                     on_done=self.scrape_signals.done.emit,
+                                     on_error=self.scrape_signals.failed.emit,
+                                     on_status=self.scrape_signals.status.emit)
+            self.status_label.setText(f"Scraping {self.scrapes_running} URL(s)...")
+
+    def on_scrape_status(self, url, message):
+        self.update_status(message)
+
+    def on_scrape_batch(self, url, videos):
+        # Rows appear (and downloads can start) while later pages are still being crawled
+        rows = self.add_videos_to_dl_table(videos)
+        if url in self.auto_download_urls:
+            self.start_download_for_rows(rows)
+
+    def on_scrape_done(self, url, videos):
+        self.scrapes_running -= 1
+        self.auto_download_urls.discard(url)
+        self.status_label.setText(f"Scraping complete. Found {len(videos)} videos.")
+
+    def on_scrape_failed(self, url, error_msg):
+        self.scrapes_running -= 1
+        self.auto_download_urls.discard(url)
+        self.status_label.setText(f"Error scraping: {error_msg}")
 
     def update_status(self, message):
         self.status_label.setText(message)
-        QApplication.processEvents()
+
+    def closeEvent(self, event):
+        self.scrape_engine.shutdown()
+        self.prefetcher.shutdown()
+        # Keep partial data; these jobs are still queued/active in the database
+        # and resume on the next start
+        for worker in list(self.active_downloads.values()):
+            worker.pause()
+        for worker in list(self.active_downloads.values()):
+            worker.wait(3000)
+        self.job_db.close()
+        super().closeEvent(event)
 
     def add_videos_to_dl_table(self, videos):
-        start_row = self.dl_table.rowCount()
-        self.dl_table.setRowCount(start_row + len(videos))
-        
-        for i, video in enumerate(videos):
-            row = start_row + i
-            self.dl_table.setItem(row, 0, QTableWidgetItem(str(1000 + row)))
-            self.dl_table.setItem(row, 1, QTableWidgetItem(video['title']))
-            self.dl_table.setItem(row, 2, QTableWidgetItem(video['url']))
-            self.dl_table.setItem(row, 3, QTableWidgetItem("Queued"))
-            self.dl_table.setItem(row, 4, QTableWidgetItem("Video"))
-            self.dl_table.setItem(row, 5, QTableWidgetItem(video['platform']))
-            self.dl_table.setItem(row, 6, QTableWidgetItem("Unknown"))
+        rows = []
+        for video in videos:
+            extra = {k: v for k, v in video.items() if k not in ("title", "url", "platform")}
+            rows.append({
+                "title": video['title'],
+                "url": video['url'],
+                "status": "Queued",
+                "state": JOB_NEW,
+                "type": "Video",
+                "platform": video['platform'],
+                "size": "Unknown",
+                "extra": extra or None,
+            })
+        # Already listed URLs are skipped; returns the rows actually added
+        added = self.dl_model.add_rows(rows)
+        self.job_db.save(self.dl_store.row_dict(row) for row in added)
+        return added
 
     def create_placeholder_logo(self, text, w, h, color):
         label = QLabel()
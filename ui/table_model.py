@@ -0,0 +1,122 @@
+from array import array
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex
+
+
+class StoreTableModel(QAbstractTableModel):
+    """
+    Read-only Qt model over a ColumnStore. Cells are produced on demand in
+    data(), so a table with tens of thousands of rows costs no widgets, and
+    an update repaints a single cell instead of replacing a QTableWidgetItem.
+
+    Sorting is done here on the raw column lists (a QSortFilterProxyModel
+    would call back into data() for every comparison). `order` maps view rows
+    to store rows; rows added after a sort are appended at the bottom.
+    """
+
+    def __init__(self, store, headers, columns, parent=None):
+        super().__init__(parent)
+        self.store = store
+        self.headers = list(headers)
+        self.columns = list(columns)  # Store column per view column; "id" is the row ID
+        self.order = None  # array of store rows in view order, None when unsorted
+        self.position = None  # store row: view row
+        self.sort_key = None  # (column, order) of the last sort
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.store)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.columns)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or role != Qt.DisplayRole:
+            return None
+        value = self.store.get(self.store_row(index.row()), self.columns[index.column()])
+        return "" if value is None else str(value)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.headers[section]
+        return super().headerData(section, orientation, role)
+
+    def store_row(self, view_row):
+        return view_row if self.order is None else self.order[view_row]
+
+    def view_row(self, store_row):
+        return store_row if self.position is None else self.position[store_row]
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        name = self.columns[column]
+        values = self.store.ids if name == "id" else self.store.data[name]
+        self.layoutAboutToBeChanged.emit()
+        persistent = self.persistentIndexList()
+        old_rows = [self.store_row(index.row()) for index in persistent]
+
+        def key(row):
+            value = values[row]
+            return (value is None, "" if value is None else value)
+        self.order = array('l', sorted(range(len(values)), key=key, reverse=(order == Qt.DescendingOrder)))
+        self.position = array('l', bytes(len(self.order) * self.order.itemsize))
+        for view_row, store_row in enumerate(self.order):
+            self.position[store_row] = view_row
+        self.sort_key = (column, order)
+
+        # Keep the selection and current row on the same records
+        self.changePersistentIndexList(persistent, [
+            self.index(self.position[row], index.column()) for row, index in zip(old_rows, persistent)])
+        self.layoutChanged.emit()
+
+    def add_rows(self, rows):
+        """Appends dicts of column values, skipping duplicate keys. Returns the new store rows."""
+        key = self.store.key
+        fresh = {}
+        for values in rows:
+            if self.store.find(values.get(key)) is None:
+                fresh.setdefault(values.get(key), values)
+        if not fresh:
+            return []
+        first = len(self.store)
+        self.beginInsertRows(QModelIndex(), first, first + len(fresh) - 1)
+        added = self.store.add_many(fresh.values())
+        if self.order is not None:
+            self.order.extend(added)
+            self.position.extend(added)
+        self.endInsertRows()
+        return added
+
+    def remove_rows(self, rows):
+        """Deletes store rows; the remaining rows keep the current sort."""
+        if not rows:
+            return
+        self.beginResetModel()
+        self.store.remove_rows(rows)
+        self.order = self.position = None
+        self.endResetModel()
+        if self.sort_key:
+            self.sort(*self.sort_key)
+
+    def set_value(self, row, column, value):
+        """Updates one cell of a store row and repaints just that cell."""
+        self.store.set(row, column, value)
+        if column in self.columns:
+            index = self.index(self.view_row(row), self.columns.index(column))
+            self.dataChanged.emit(index, index, [Qt.DisplayRole])
+
+    def set_values(self, updates):
+        """
+        Applies {store row: {column: value}} and repaints the changed area with
+        a single dataChanged, e.g. once per progress tick for all running jobs.
+        """
+        view_rows, view_columns = [], []
+        for row, values in updates.items():
+            for column, value in values.items():
+                self.store.set(row, column, value)
+                if column in self.columns:
+                    view_columns.append(self.columns.index(column))
+            view_rows.append(self.view_row(row))
+        if view_rows and view_columns:
+            self.dataChanged.emit(self.index(min(view_rows), min(view_columns)),
+                                  self.index(max(view_rows), max(view_columns)), [Qt.DisplayRole])
+
+    def value(self, row, column):
+        return self.store.get(row, column)